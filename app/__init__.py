@@ -1,21 +1,51 @@
 # app/__init__.py
 from flask import Flask
-from config import Config
+import os
+from config import PROFILES
 from .models import db
+from . import database
+from .barcode_cache import barcode_cache
+from .search import search_index
+from .rollup import rollup_cli
+from .response_cache import response_cache
+from .low_stock import low_stock
+from .exports import export_cli
+from . import queries
+from .instrumentation import instrumentation, init_profiling
+from . import bridge_logging
+from .catalog_import import catalog_cli
+from .ledger import ledger_cli
+from .replenishment import replenish_cli
 from flask_migrate import Migrate
 from flask_sock import Sock
 import datetime
 
 sock = Sock()
 
-def create_app(config_class=Config):
+def create_app(config_class=None):
+    """`config_class` is a config class or a profile name from config.PROFILES; default is the CONFIG_PROFILE env var (mysql)."""
+    if config_class is None or isinstance(config_class, str):
+        config_class = PROFILES[config_class or os.environ.get('CONFIG_PROFILE', 'mysql')]
     app = Flask(__name__)
     app.config.from_object(config_class)
 
     # Initialize extensions
-    db.init_app(app)
+    database.init_app(app)  # db.init_app plus engine/pool setup
     Migrate(app, db)
     sock.init_app(app)
+    barcode_cache.init_app(app)
+    search_index.init_app(app)
+    response_cache.init_app(app, db.session)
+    low_stock.init_app(app, db.session)
+    instrumentation.init_app(app)
+    init_profiling(app)
+    bridge_logging.init_app(app)
+    app.cli.add_command(rollup_cli)
+    app.cli.add_command(export_cli)
+    app.cli.add_command(queries.queries_cli)
+    app.cli.add_command(catalog_cli)
+    app.cli.add_command(ledger_cli)
+    app.cli.add_command(replenish_cli)
 
     # Import and register the blueprint
     from . import routes
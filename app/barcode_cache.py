@@ -0,0 +1,100 @@
+# app/barcode_cache.py
+import time
+import threading
+from collections import OrderedDict
+from .models import Product
+
+_MISSING = object()
+
+
+def product_payload(product):
+    """The JSON shape served by /api/products/by_barcode."""
+    return {'ProductID': product.ProductID, 'ProductName': product.ProductName, 'Price': float(product.Price), 'StockQuantity': product.StockQuantity}
+
+
+class BarcodeCache:
+    """
+    Bounded, LRU-evicted barcode -> product payload index held in the app process.
+
+    Unknown barcodes are cached too (as None) so repeated scans of an unlisted
+    item don't hit the database either, but only for miss_ttl seconds: a product
+    added by another process or a CLI import can't invalidate this one's
+    cache, so it shows up once the miss expires. Writers call invalidate() *after* they
+    commit; a generation counter stops a lookup that raced with an invalidation
+    from re-caching the stale row it read.
+    """
+
+    def __init__(self, max_size=10000, miss_ttl=60):
+        self.max_size = max_size
+        self.miss_ttl = miss_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._barcodes_by_id = {}
+        self._miss_expires = {}    # barcode -> monotonic time its cached None stops counting
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_size = app.config.get('BARCODE_CACHE_SIZE', self.max_size)
+        self.miss_ttl = app.config.get('BARCODE_CACHE_MISS_TTL', self.miss_ttl)
+        if app.config.get('BARCODE_CACHE_WARM', True):
+            with app.app_context():
+                try: self.warm()
+                except Exception as e: app.logger.warning(f"Barcode cache not warmed: {e}")
+
+    def warm(self):
+        products = Product.query.filter(Product.Barcode.isnot(None)).order_by(Product.LastUpdated.desc()).limit(self.max_size).all()
+        with self._lock:
+            for product in reversed(products): self._put(product.Barcode, product_payload(product))
+
+    def get(self, barcode):
+        with self._lock:
+            payload = self._entries.get(barcode, _MISSING)
+            if payload is None and self._miss_expires.get(barcode, 0) <= time.monotonic(): payload = _MISSING
+            if payload is not _MISSING:
+                self._entries.move_to_end(barcode); self.hits += 1
+                return payload
+            self.misses += 1
+            generation = self._generation
+        product = Product.query.filter_by(Barcode=barcode).first()
+        payload = product_payload(product) if product else None
+        with self._lock:
+            if generation == self._generation: self._put(barcode, payload)
+        return payload
+
+    def invalidate(self, product_ids=(), barcodes=()):
+        with self._lock:
+            self._generation += 1
+            for product_id in product_ids:
+                barcode = self._barcodes_by_id.pop(product_id, None)
+                if barcode is not None: self._entries.pop(barcode, None)
+            for barcode in barcodes:
+                self._forget(barcode, self._entries.pop(barcode, None))
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear(); self._barcodes_by_id.clear(); self._miss_expires.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self._entries), 'max_size': self.max_size, 'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0}
+
+    def _put(self, barcode, payload):
+        self._forget(barcode, self._entries.pop(barcode, None))
+        self._entries[barcode] = payload
+        if payload: self._barcodes_by_id[payload['ProductID']] = barcode
+        else: self._miss_expires[barcode] = time.monotonic() + self.miss_ttl
+        while len(self._entries) > self.max_size:
+            self._forget(*self._entries.popitem(last=False))
+
+    def _forget(self, barcode, payload):
+        self._miss_expires.pop(barcode, None)
+        if payload and self._barcodes_by_id.get(payload['ProductID']) == barcode:
+            del self._barcodes_by_id[payload['ProductID']]
+
+
+barcode_cache = BarcodeCache()
@@ -0,0 +1,81 @@
+# app/bridge_logging.py
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+logger = logging.getLogger('grocerymax.bridge')
+_listener = None
+
+
+def log_event(level, event, **fields):
+    """Logs one structured bridge event, e.g. log_event(logging.INFO, 'scan_delivered', scanner_id=..., total_ms=...)."""
+    if logger.isEnabledFor(level): logger.log(level, event, extra={'fields': fields})
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, event, then the event's fields."""
+
+    def format(self, record):
+        entry = {'ts': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec='milliseconds'),
+                 'level': record.levelname, 'logger': record.name, 'event': record.getMessage()}
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info: entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets a repeating warning/error through once per `interval` seconds per
+    (event, scanner/client) and drops the rest, so a flapping scanner can't
+    flood the log; the next one that gets through carries `suppressed=<n>`.
+    """
+
+    def __init__(self, interval=10.0):
+        super().__init__()
+        self.interval = interval
+        self._seen = {}    # key -> [last emitted at, suppressed since]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING: return True
+        fields = getattr(record, 'fields', None) or {}
+        key = (record.name, record.msg, fields.get('scanner_id'), fields.get('client'))
+        now = time.monotonic()
+        with self._lock:
+            seen = self._seen.get(key)
+            if seen and now - seen[0] < self.interval: seen[1] += 1; return False
+            suppressed = seen[1] if seen else 0
+            self._seen[key] = [now, 0]
+            if len(self._seen) > 10000: self._seen = {k: v for k, v in self._seen.items() if now - v[0] < self.interval}
+        if suppressed: record.fields = {**fields, 'suppressed': suppressed}
+        return True
+
+
+def init_app(app):
+    """
+    Routes bridge events through a QueueHandler to a background QueueListener
+    that writes them to BRIDGE_LOG_FILE (stdout when unset), so scan, TCP and
+    WebSocket threads never wait on log I/O. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None: return
+    log_file = app.config.get('BRIDGE_LOG_FILE')
+    target = logging.FileHandler(log_file) if log_file else logging.StreamHandler(sys.stdout)
+    target.setFormatter(logging.Formatter('%(message)s'))
+    records = queue.SimpleQueue()
+    # QueueHandler renders the JSON line on the calling thread (cheap, no I/O); the listener only writes it
+    handler = logging.handlers.QueueHandler(records)
+    handler.setFormatter(JsonFormatter())
+    handler.addFilter(RateLimitFilter(app.config.get('BRIDGE_LOG_ERROR_INTERVAL', 10.0)))
+    logger.addHandler(handler)
+    logger.setLevel(app.config.get('BRIDGE_LOG_LEVEL', 'INFO'))
+    logger.propagate = False
+    _listener = logging.handlers.QueueListener(records, target)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,96 @@
+# app/bulk_update.py
+import datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import select, update, insert, case
+from .models import db, Product, InventoryLog
+from .low_stock import low_stock
+
+BULK_UPDATE_CHUNK_SIZE = 500
+
+
+def _parse_item(item):
+    """Validates one request item into (product_id, price, stock_delta, stock, expected_version)."""
+    if not isinstance(item, dict): raise ValueError("Item must be an object.")
+    try: product_id = int(item['product_id'])
+    except (KeyError, TypeError, ValueError): raise ValueError("product_id is required.")
+    price = stock_delta = stock = expected = None
+    if item.get('price') is not None:
+        try: price = Decimal(str(item['price']))
+        except InvalidOperation: raise ValueError("price must be a number.")
+        if not price.is_finite() or price < 0: raise ValueError("price must be zero or more.")
+        price = price.quantize(Decimal('0.01'))
+    for field in ('stock_delta', 'stock'):
+        value = item.get(field)
+        if value is None: continue
+        if isinstance(value, bool) or not isinstance(value, int) and not str(value).lstrip('-').isdigit(): raise ValueError(f"{field} must be a whole number.")
+        if field == 'stock_delta': stock_delta = int(value)
+        else: stock = int(value)
+    if stock_delta is not None and stock is not None: raise ValueError("Give either stock_delta or stock, not both.")
+    if price is None and stock_delta is None and stock is None: raise ValueError("Nothing to update.")
+    if item.get('last_updated'):
+        try: expected = datetime.datetime.fromisoformat(str(item['last_updated']))
+        except ValueError: raise ValueError("last_updated must be an ISO timestamp.")
+    return product_id, price, stock_delta, stock, expected
+
+
+def apply_bulk_update(items, change_type='Stock Correction', notes=None, chunk_size=BULK_UPDATE_CHUNK_SIZE):
+    """
+    Applies price changes and stock deltas/counts to many products in one
+    transaction and returns one result per item, in request order.
+
+    Each chunk of products is locked in ProductID order, checked, and written
+    with one UPDATE (CASE per column); stock changes get InventoryLogs in one
+    bulk insert. An item carrying `last_updated` is only applied if the
+    product hasn't changed since that version (optimistic check); conflicting
+    or invalid items are reported and skipped without affecting the rest.
+    The caller commits.
+    """
+    results = [None] * len(items); parsed = {}
+    for index, item in enumerate(items):
+        try: product_id, price, stock_delta, stock, expected = _parse_item(item)
+        except ValueError as e: results[index] = {'status': 'invalid', 'message': str(e)}; continue
+        if product_id in parsed: results[index] = {'product_id': product_id, 'status': 'invalid', 'message': "Product listed more than once."}; continue
+        parsed[product_id] = (index, price, stock_delta, stock, expected)
+
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    product_ids = sorted(parsed)
+    for start in range(0, len(product_ids), chunk_size):
+        chunk = product_ids[start:start + chunk_size]
+        current = {row.ProductID: row for row in db.session.execute(
+            select(Product.ProductID, Product.Price, Product.StockQuantity, Product.LastUpdated)
+            .where(Product.ProductID.in_(chunk)).order_by(Product.ProductID).with_for_update()
+        ).all()}
+        prices, deltas, versions = {}, {}, {}
+        for product_id in chunk:
+            index, price, stock_delta, stock, expected = parsed[product_id]
+            row = current.get(product_id)
+            result = results[index] = {'product_id': product_id}
+            if row is None: result.update(status='not_found', message="Product not found."); continue
+            if expected is not None and row.LastUpdated != expected:
+                result.update(status='conflict', message="Product changed since last_updated.", last_updated=row.LastUpdated.isoformat() if row.LastUpdated else None); continue
+            delta = stock - row.StockQuantity if stock is not None else stock_delta or 0
+            if row.StockQuantity + delta < 0:
+                result.update(status='invalid', message=f"Stock would go negative ({row.StockQuantity} on hand)."); continue
+            if price is not None and price != row.Price: prices[product_id] = price
+            if delta: deltas[product_id] = delta
+            if product_id in prices or delta:
+                # TIMESTAMP keeps whole seconds, so step past the old version to keep the token strictly increasing
+                versions[product_id] = max(now, row.LastUpdated.replace(microsecond=0) + datetime.timedelta(seconds=1)) if row.LastUpdated else now
+            result.update(status='updated', price=float(price if price is not None else row.Price), stock=row.StockQuantity + delta)
+        changed = sorted(versions)
+        if not changed: continue
+        values = {'LastUpdated': case(versions, value=Product.ProductID)}
+        if prices: values['Price'] = case(prices, value=Product.ProductID, else_=Product.Price)
+        if deltas: values['StockQuantity'] = Product.StockQuantity + case(deltas, value=Product.ProductID, else_=0)
+        db.session.execute(update(Product).where(Product.ProductID.in_(changed)).values(**values).execution_options(synchronize_session=False))
+        low_stock.track(changed)
+        if deltas:
+            db.session.execute(insert(InventoryLog), [
+                {'ProductID': product_id, 'ChangeType': change_type, 'QuantityChange': delta, 'Notes': notes or "Bulk update"}
+                for product_id, delta in sorted(deltas.items())
+            ])
+        for product_id in changed: results[parsed[product_id][0]]['last_updated'] = versions[product_id].isoformat()
+    for product_id in product_ids:
+        result = results[parsed[product_id][0]]
+        if result['status'] == 'updated' and 'last_updated' not in result: result['status'] = 'unchanged'
+    return results
@@ -0,0 +1,253 @@
+# app/catalog_import.py
+import io
+import csv
+import json
+import datetime
+from decimal import Decimal, InvalidOperation
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select, insert, update, or_, func
+from sqlalchemy.dialects import mysql
+from .models import db, Product, Category, Supplier, InventoryLog
+from .barcode_cache import barcode_cache
+from .search import search_index
+from .low_stock import low_stock
+
+IMPORT_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+SEARCH_REBUILD_THRESHOLD = 1000   # above this many changed products, rebuild the search index once instead of patching it
+
+# Accepted column headings / JSON keys (case, spaces and underscores ignored)
+FIELD_ALIASES = {
+    'productname': 'ProductName', 'name': 'ProductName', 'description': 'Description', 'price': 'Price',
+    'stockquantity': 'StockQuantity', 'stock': 'StockQuantity', 'quantity': 'StockQuantity', 'barcode': 'Barcode',
+    'category': 'Category', 'categoryname': 'Category', 'supplier': 'Supplier', 'suppliername': 'Supplier',
+}
+UPDATABLE_FIELDS = ('ProductName', 'Description', 'Price', 'Barcode', 'CategoryID', 'SupplierID')
+
+
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []    # (row number, message), capped at MAX_REPORTED_ERRORS
+
+    def error(self, row_number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS: self.errors.append((row_number, message))
+
+    def as_dict(self):
+        return {'inserted': self.inserted, 'updated': self.updated, 'failed': self.failed,
+                'errors': [{'row': row, 'message': message} for row, message in self.errors]}
+
+
+# --- READERS: yield (row number, {field: raw value}) without loading the whole file ---
+def _canonical(record):
+    return {FIELD_ALIASES[k]: v for k, v in ((str(key).strip().lower().replace(' ', '').replace('_', ''), value) for key, value in record.items()) if k in FIELD_ALIASES}
+
+
+def iter_csv(stream):
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for number, record in enumerate(reader, start=2):    # row 1 is the header
+        yield number, _canonical(record)
+
+
+def iter_json(stream, chunk_size=64 * 1024):
+    """Objects from a JSON array or from JSON Lines, decoded incrementally."""
+    decoder = json.JSONDecoder(); text = io.TextIOWrapper(stream, encoding='utf-8-sig')
+    buffer = ''; position = 0; number = 0; started = False; eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,': position += 1
+        if not started and position < len(buffer):
+            started = True
+            if buffer[position] == '[': position += 1; continue
+        if position < len(buffer) and buffer[position] == ']': return
+        try:
+            record, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            if eof:
+                if buffer[position:].strip(): raise ValueError(f"Malformed JSON after record {number}.")
+                return
+            chunk = text.read(chunk_size); eof = not chunk
+            buffer = buffer[position:] + chunk; position = 0
+            continue
+        number += 1; position = end
+        yield number, _canonical(record) if isinstance(record, dict) else None
+
+
+# --- VALIDATION ---
+def _text(value, limit, field):
+    value = '' if value is None else str(value).strip()
+    if len(value) > limit: raise ValueError(f"{field} is longer than {limit} characters.")
+    return value or None
+
+
+def clean_row(raw):
+    if raw is None: raise ValueError("Not an object.")
+    name = _text(raw.get('ProductName'), 255, 'ProductName')
+    if not name: raise ValueError("ProductName is required.")
+    try: price = Decimal(str(raw.get('Price', '')).strip())
+    except InvalidOperation: raise ValueError("Price must be a number.")
+    if not price.is_finite() or price < 0: raise ValueError("Price must be zero or more.")
+    stock = str(raw.get('StockQuantity') or '0').strip()
+    if not stock.lstrip('-').isdigit() or int(stock) < 0: raise ValueError("StockQuantity must be a whole number, zero or more.")
+    return {'ProductName': name, 'Description': _text(raw.get('Description'), 65535, 'Description'), 'Price': price.quantize(Decimal('0.01')),
+            'StockQuantity': int(stock), 'Barcode': _text(raw.get('Barcode'), 100, 'Barcode'),
+            'Category': _text(raw.get('Category'), 100, 'Category'), 'Supplier': _text(raw.get('Supplier'), 255, 'Supplier')}
+
+
+# --- IMPORT ---
+class CatalogImporter:
+    """
+    Upserts products from (row number, raw record) pairs in chunks of
+    IMPORT_CHUNK_SIZE, committing each chunk on its own so a bad row or chunk
+    is reported without losing the rest of the run.
+
+    A row updates the product with the same Barcode, or else the same
+    ProductName, and inserts a new product otherwise. Category and Supplier
+    names are resolved per chunk with one IN query each; unknown names are
+    created. StockQuantity only seeds new products (logged as 'Initial Stock');
+    existing stock is left to inventory adjustments. Columns missing from the
+    file, and blank cells, never overwrite an existing product's values.
+    """
+
+    def __init__(self, chunk_size=IMPORT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.report = ImportReport()
+        self._category_ids = {}
+        self._supplier_ids = {}
+        self._changed_ids = []
+
+    def run(self, records):
+        chunk = []; present = set()
+        try:
+            for number, raw in records:
+                if raw: present.update(raw)
+                chunk.append((number, raw))
+                if len(chunk) >= self.chunk_size: self._import_chunk(chunk, present); chunk = []
+        except ValueError as e:     # unreadable remainder of the file (bad JSON, bad encoding); keep what was read
+            self.report.error(None, f"Stopped reading the file: {e}")
+        if chunk: self._import_chunk(chunk, present)
+        self._refresh_search_index()
+        return self.report
+
+    def _import_chunk(self, chunk, present):
+        rows = []; names = {}; barcodes = {}
+        for number, raw in chunk:
+            try: row = clean_row(raw)
+            except ValueError as e: self.report.error(number, str(e)); continue
+            duplicate = names.get(row['ProductName'].lower()) or (row['Barcode'] and barcodes.get(row['Barcode']))
+            if duplicate: self.report.error(number, f"Duplicates row {duplicate} of the file."); continue
+            names[row['ProductName'].lower()] = number
+            if row['Barcode']: barcodes[row['Barcode']] = number
+            rows.append((number, row))
+        if not rows: return
+        try:
+            inserted, updated, errors = self._upsert(rows, present)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            self._category_ids.clear(); self._supplier_ids.clear()   # may hold IDs created by the rolled-back chunk
+            for number, _ in rows: self.report.error(number, f"Chunk failed: {e}")
+            return
+        for number, message in errors: self.report.error(number, message)
+        self.report.inserted += len(inserted); self.report.updated += len(updated)
+        self._changed_ids += inserted + updated
+        barcode_cache.invalidate(product_ids=updated, barcodes=[row['Barcode'] for _, row in rows if row['Barcode']])
+
+    def _resolve(self, model, name_column, id_column, cache, names):
+        missing = {}   # lowercased -> name as first spelt; names match case-insensitively, as they do on MySQL
+        for name in sorted(n for n in names if n):
+            if name.lower() not in cache: missing.setdefault(name.lower(), name)
+        if missing:
+            lookup = select(id_column, name_column).where(func.lower(name_column).in_(list(missing)))
+            for row_id, name in db.session.execute(lookup).all(): cache[name.lower()] = row_id
+            new = [name for key, name in sorted(missing.items()) if key not in cache]
+            if new:
+                db.session.execute(insert(model), [{name_column.key: name} for name in new])
+                for row_id, name in db.session.execute(lookup).all(): cache[name.lower()] = row_id
+
+    def _upsert(self, rows, present):
+        self._resolve(Category, Category.CategoryName, Category.CategoryID, self._category_ids, {row['Category'] for _, row in rows})
+        self._resolve(Supplier, Supplier.SupplierName, Supplier.SupplierID, self._supplier_ids, {row['Supplier'] for _, row in rows})
+        names = [row['ProductName'] for _, row in rows]; barcodes = [row['Barcode'] for _, row in rows if row['Barcode']]
+        existing = db.session.execute(
+            select(Product.ProductID, Product.ProductName, Product.Barcode)
+            .where(or_(func.lower(Product.ProductName).in_({name.lower() for name in names}), Product.Barcode.in_(barcodes)))
+        ).all()
+        by_name = {p.ProductName.lower(): p for p in existing}; by_barcode = {p.Barcode: p for p in existing if p.Barcode}
+
+        now = datetime.datetime.utcnow(); values = []; new_rows = []; updated_ids = []; errors = []
+        columns = [f for f in UPDATABLE_FIELDS if f in present or (f == 'CategoryID' and 'Category' in present) or (f == 'SupplierID' and 'Supplier' in present)]
+        for number, row in rows:
+            match_barcode = by_barcode.get(row['Barcode']) if row['Barcode'] else None
+            match_name = by_name.get(row['ProductName'].lower())
+            if match_barcode and match_name and match_barcode.ProductID != match_name.ProductID:
+                errors.append((number, f"Barcode {row['Barcode']} belongs to '{match_barcode.ProductName}', not '{row['ProductName']}'.")); continue
+            match = match_barcode or match_name
+            record = {'ProductName': row['ProductName'], 'Description': row['Description'], 'Price': row['Price'], 'Barcode': row['Barcode'],
+                      'CategoryID': self._category_ids.get((row['Category'] or '').lower()), 'SupplierID': self._supplier_ids.get((row['Supplier'] or '').lower()),
+                      'LastUpdated': now}
+            if match:
+                values.append({'ProductID': match.ProductID, **{c: record[c] for c in columns if record[c] is not None}, 'LastUpdated': now}); updated_ids.append(match.ProductID)
+            else:
+                values.append({**record, 'StockQuantity': row['StockQuantity']}); new_rows.append(row)
+
+        if db.session.get_bind().dialect.name in ('mysql', 'mariadb'):
+            # One statement for the chunk: new rows insert, rows keyed by an existing PK/name/barcode update in place
+            self._mysql_upsert(values, columns)
+        else:
+            inserts = [v for v in values if 'ProductID' not in v]; updates = [v for v in values if 'ProductID' in v]
+            if inserts: db.session.execute(insert(Product), inserts)
+            if updates: db.session.execute(update(Product), updates)
+
+        created = {}
+        if new_rows:
+            created = {name.lower(): pid for pid, name in db.session.execute(
+                select(Product.ProductID, Product.ProductName).where(func.lower(Product.ProductName).in_([row['ProductName'].lower() for row in new_rows]))).all()}
+            logs = [{'ProductID': created[row['ProductName'].lower()], 'ChangeType': 'Initial Stock', 'QuantityChange': row['StockQuantity'], 'Notes': 'Catalog import'}
+                    for row in new_rows if row['StockQuantity']]
+            if logs: db.session.execute(insert(InventoryLog), logs)
+        low_stock.track(list(created.values()) + updated_ids)
+        return [created[row['ProductName'].lower()] for row in new_rows], updated_ids, errors
+
+    @staticmethod
+    def _mysql_upsert(values, columns):
+        groups = {}
+        for value in values: groups.setdefault(tuple(sorted(value)), []).append(value)   # multi-row VALUES need matching keys
+        for group in groups.values():
+            stmt = mysql.insert(Product).values(group)
+            stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in (*columns, 'LastUpdated') if c in group[0]})
+            db.session.execute(stmt)
+
+    def _refresh_search_index(self):
+        if not self._changed_ids: return
+        if len(self._changed_ids) > SEARCH_REBUILD_THRESHOLD: search_index.build(); return
+        for row in db.session.execute(select(Product.ProductID, Product.ProductName, Product.Barcode, Product.Description)
+                                      .where(Product.ProductID.in_(self._changed_ids))).all():
+            search_index.add(*row)
+
+
+def import_catalog(stream, file_format, chunk_size=IMPORT_CHUNK_SIZE):
+    records = iter_csv(stream) if file_format == 'csv' else iter_json(stream)
+    return CatalogImporter(chunk_size).run(records)
+
+
+def detect_format(filename, default='csv'):
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    return 'json' if extension in ('json', 'jsonl', 'ndjson') else 'csv' if extension == 'csv' else default
+
+
+# --- CLI: flask catalog import FILE [--format csv|json] ---
+catalog_cli = AppGroup('catalog', help='Bulk catalog maintenance.')
+
+@catalog_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'json']), default=None, help='Defaults to the file extension.')
+@click.option('--chunk-size', default=IMPORT_CHUNK_SIZE, show_default=True)
+def import_command(path, file_format, chunk_size):
+    """Upsert products from a CSV or JSON (array or JSON Lines) file."""
+    with open(path, 'rb') as stream: report = import_catalog(stream, file_format or detect_format(path), chunk_size)
+    click.echo(f"Inserted {report.inserted}, updated {report.updated}, failed {report.failed}.")
+    for row, message in report.errors: click.echo(f"  {f'row {row}: ' if row else ''}{message}")
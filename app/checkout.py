@@ -0,0 +1,79 @@
+# app/checkout.py
+from sqlalchemy import select, update, insert, case
+import datetime
+from .models import db, Product, Sale, SaleDetail, InventoryLog
+from .low_stock import low_stock
+from . import rollup
+
+
+class CheckoutError(Exception):
+    pass
+
+
+def _merge_cart_lines(items):
+    """Collapses the cart into {product_id: quantity}, merging repeated products."""
+    quantities = {}
+    for item in items:
+        try:
+            product_id = int(item['product_id']); quantity = int(item['quantity'])
+        except (KeyError, TypeError, ValueError):
+            raise CheckoutError("Malformed cart line.")
+        if quantity <= 0: raise CheckoutError("Quantities must be positive.")
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    return quantities
+
+
+def process_checkout(items, customer_id=None, payment_method=None):
+    """
+    Records a sale for the given cart lines in a fixed number of statements.
+
+    All cart products are locked with one SELECT ... FOR UPDATE in ProductID
+    order (so two tills can never deadlock on each other's baskets), stock is
+    decremented with a single conditional UPDATE and the SaleDetails and
+    InventoryLogs rows are bulk-inserted. The daily rollups are updated in the
+    same transaction. The caller owns the transaction:
+    commit on success, rollback on CheckoutError.
+    """
+    quantities = _merge_cart_lines(items)
+    if not quantities: raise CheckoutError("Cart is empty.")
+    product_ids = sorted(quantities)
+
+    rows = db.session.execute(
+        select(Product.ProductID, Product.ProductName, Product.Price, Product.StockQuantity, Product.CategoryID)
+        .where(Product.ProductID.in_(product_ids))
+        .order_by(Product.ProductID)
+        .with_for_update()
+    ).all()
+    products = {row.ProductID: row for row in rows}
+    for product_id in product_ids:
+        product = products.get(product_id)
+        if not product or product.StockQuantity < quantities[product_id]:
+            raise CheckoutError(f"Insufficient stock for {product.ProductName if product else 'Unknown'}.")
+
+    new_sale = Sale(CustomerID=customer_id, SaleDate=datetime.datetime.utcnow(), TotalAmount=0, PaymentMethod=payment_method)
+    db.session.add(new_sale); db.session.flush()
+
+    # The stock guard is repeated in the UPDATE itself, so a row that changed
+    # underneath us (e.g. on a backend without FOR UPDATE) fails the sale.
+    sold = case(quantities, value=Product.ProductID)
+    result = db.session.execute(
+        update(Product)
+        .where(Product.ProductID.in_(product_ids), Product.StockQuantity >= sold)
+        .values(StockQuantity=Product.StockQuantity - sold)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(product_ids): raise CheckoutError("Stock changed during checkout, please retry.")
+    low_stock.track(product_ids)
+
+    details, logs, total_sale_amount = [], [], 0
+    for product_id in product_ids:
+        price = products[product_id].Price; quantity = quantities[product_id]
+        line_total = price * quantity; total_sale_amount += line_total
+        details.append({'SaleID': new_sale.SaleID, 'ProductID': product_id, 'Quantity': quantity, 'UnitPrice': price, 'TotalPrice': line_total})
+        logs.append({'ProductID': product_id, 'SaleID': new_sale.SaleID, 'ChangeType': 'Sale', 'QuantityChange': -quantity, 'Notes': f"Sale ID: {new_sale.SaleID}"})
+    db.session.execute(insert(SaleDetail), details)
+    db.session.execute(insert(InventoryLog), logs)
+    new_sale.TotalAmount = total_sale_amount
+    rollup.record_sale(new_sale.SaleDate.date(), total_sale_amount,
+                       [(pid, products[pid].CategoryID, d['Quantity'], d['TotalPrice']) for pid, d in zip(product_ids, details)])
+    return new_sale
@@ -0,0 +1,41 @@
+# app/database.py
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from .models import db
+from .pool_metrics import MeteredQueuePool
+
+# The connect-timeout argument each MySQL driver accepts
+CONNECT_TIMEOUT_ARGS = {'mysqlconnector': 'connection_timeout', 'mysqldb': 'connect_timeout', 'pymysql': 'connect_timeout'}
+
+
+def init_app(app):
+    """
+    Creates the engine for the active profile (in place of db.init_app):
+    a metered QueuePool wherever the backend pools connections, the driver's
+    connect timeout, SQLITE_PRAGMAS on every new SQLite connection, and
+    create_all when CREATE_SCHEMA is set. Runs before anything else touches
+    the database so the first connection is already set up.
+    """
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    options = app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if not (url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')):
+        options.setdefault('poolclass', MeteredQueuePool)
+    timeout_arg = CONNECT_TIMEOUT_ARGS.get(url.get_driver_name()) if url.get_backend_name() == 'mysql' else None
+    if timeout_arg and app.config.get('DB_CONNECT_TIMEOUT'):
+        options['connect_args'] = {timeout_arg: app.config['DB_CONNECT_TIMEOUT'], **options.get('connect_args', {})}
+    db.init_app(app)
+
+    with app.app_context():
+        engine = db.engine
+        metrics = getattr(engine.pool, 'metrics', None)
+        if metrics is not None:
+            event.listen(engine, 'connect', lambda dbapi_connection, connection_record: metrics.count('connects'))
+            event.listen(engine, 'invalidate', lambda dbapi_connection, connection_record, exception: metrics.count('invalidated'))
+        pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+        if engine.dialect.name == 'sqlite' and pragmas:
+            def set_pragmas(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                for name, value in pragmas.items(): cursor.execute(f"PRAGMA {name}={value}")
+                cursor.close()
+            event.listen(engine, 'connect', set_pragmas)
+        if app.config.get('CREATE_SCHEMA'): db.create_all()
@@ -0,0 +1,179 @@
+# app/exports.py
+import os
+import csv
+import glob
+import json
+import zlib
+import shutil
+import datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select, func
+from .models import db, Sale, SaleDetail, Product, Category, Customer
+
+EXPORT_BATCH_SIZE = 1000      # rows fetched per round trip / SaleIDs per window
+CSV_CHUNK_BYTES = 64 * 1024   # flush the CSV buffer to the client roughly this often
+
+SALE_COLUMNS = ['ID', 'Date', 'Customer', 'Total', 'Payment Method']
+LINE_ITEM_COLUMNS = SALE_COLUMNS + ['Product ID', 'Product', 'Quantity', 'Unit Price', 'Line Total']
+
+
+class _LineBuffer:
+    """csv.writer target that just collects what it's given."""
+    def __init__(self): self.parts = []; self.size = 0
+    def write(self, text): self.parts.append(text); self.size += len(text)
+    def drain(self):
+        text = ''.join(self.parts); self.parts = []; self.size = 0
+        return text.encode('utf-8')
+
+
+def csv_chunks(header, rows):
+    """Yields the CSV as ~CSV_CHUNK_BYTES byte chunks without ever holding more than one chunk."""
+    buffer = _LineBuffer(); writer = csv.writer(buffer)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.size >= CSV_CHUNK_BYTES: yield buffer.drain()
+    if buffer.size: yield buffer.drain()
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)   # wbits 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data: yield data
+    yield compressor.flush()
+
+
+def iter_rows(stmt, batch_size=EXPORT_BATCH_SIZE):
+    """Streams a Core select from a server-side cursor, batch_size rows per fetch."""
+    result = db.session.execute(stmt.execution_options(stream_results=True, yield_per=batch_size))
+    for partition in result.partitions(): yield from partition
+
+
+def _sale_id_windows(filters, batch_size):
+    """
+    Splits the export into SaleID ranges when the driver can't hold a server-side
+    cursor (e.g. mysql-connector buffers every streamed result client-side), so
+    each statement returns at most batch_size sales. A single unbounded window
+    is used otherwise.
+    """
+    if db.session.get_bind().dialect.supports_server_side_cursors:
+        yield (); return
+    lo, hi = db.session.execute(select(func.min(Sale.SaleID), func.max(Sale.SaleID)).where(*filters)).one()
+    if lo is None: return
+    for upper in range(hi, lo - 1, -batch_size):
+        yield (Sale.SaleID <= upper, Sale.SaleID > upper - batch_size)
+
+
+def _customer_name(first_name, last_name):
+    return f"{first_name} {last_name or ''}" if first_name is not None else "Guest"
+
+
+def sales_rows(filters, line_items=False, batch_size=EXPORT_BATCH_SIZE):
+    """CSV rows for the sales matching `filters`, newest first, one per sale or (line_items) per sale line."""
+    columns = [Sale.SaleID, Sale.SaleDate, Customer.FirstName, Customer.LastName, Sale.TotalAmount, Sale.PaymentMethod]
+    if line_items:
+        base = (select(*columns, SaleDetail.ProductID, Product.ProductName, SaleDetail.Quantity, SaleDetail.UnitPrice, SaleDetail.TotalPrice)
+                .select_from(SaleDetail).join(Sale, SaleDetail.SaleID == Sale.SaleID).join(Product, SaleDetail.ProductID == Product.ProductID)
+                .outerjoin(Customer, Sale.CustomerID == Customer.CustomerID).order_by(Sale.SaleID.desc(), SaleDetail.SaleDetailID))
+    else:
+        base = select(*columns).outerjoin(Customer, Sale.CustomerID == Customer.CustomerID).order_by(Sale.SaleID.desc())
+    for window in _sale_id_windows(filters, batch_size):
+        for row in iter_rows(base.where(*filters, *window), batch_size):
+            sale_id, sale_date, first_name, last_name, total, payment_method, *line = row
+            yield [sale_id, sale_date.strftime('%Y-%m-%d %H:%M:%S'), _customer_name(first_name, last_name), total, payment_method, *line]
+
+
+def low_stock_rows(items):
+    """CSV rows for low_stock.items(): already in memory, so no table scan."""
+    for item in items:
+        yield [item['product_id'], item['product_name'], item['stock'], item['price'], item['reorder_point'], item['reorder_quantity']]
+
+
+# --- COLUMNAR EXPORT: flask export sales-dataset OUT_DIR [--format parquet|ipc] [--full] ---
+DATASET_BATCH_ROWS = 50000
+WATERMARK_FILE = '_watermark.json'
+
+
+def _dataset_schema(pa):
+    money = pa.decimal128(10, 2)
+    return pa.schema([
+        ('SaleID', pa.int64()), ('SaleDate', pa.timestamp('s')), ('CustomerID', pa.int64()), ('PaymentMethod', pa.string()), ('SaleTotal', money),
+        ('SaleDetailID', pa.int64()), ('ProductID', pa.int64()), ('ProductName', pa.string()), ('CategoryID', pa.int64()), ('CategoryName', pa.string()),
+        ('Quantity', pa.int32()), ('UnitPrice', money), ('LineTotal', money), ('sale_date', pa.date32()),
+    ])
+
+
+def line_item_batches(pa, schema, after_sale_id=0, batch_rows=DATASET_BATCH_ROWS, progress=None):
+    """
+    Arrow RecordBatches of every sale line with SaleID > after_sale_id, read
+    through the same streamed SaleID windows as the CSV export. `progress`
+    (a dict) receives the highest SaleID and the row count seen so far.
+    """
+    stmt = (select(Sale.SaleID, Sale.SaleDate, Sale.CustomerID, Sale.PaymentMethod, Sale.TotalAmount, SaleDetail.SaleDetailID,
+                   SaleDetail.ProductID, Product.ProductName, Product.CategoryID, Category.CategoryName, SaleDetail.Quantity, SaleDetail.UnitPrice, SaleDetail.TotalPrice)
+            .select_from(SaleDetail).join(Sale, SaleDetail.SaleID == Sale.SaleID).join(Product, SaleDetail.ProductID == Product.ProductID)
+            .outerjoin(Category, Product.CategoryID == Category.CategoryID).order_by(Sale.SaleID, SaleDetail.SaleDetailID))
+    progress = progress if progress is not None else {}
+    progress.setdefault('last_sale_id', after_sale_id); progress.setdefault('rows', 0)
+    filters = [Sale.SaleID > after_sale_id]
+    names = schema.names; columns = {name: [] for name in names}
+    for window in _sale_id_windows(filters, EXPORT_BATCH_SIZE):
+        for row in iter_rows(stmt.where(*filters, *window)):
+            for name, value in zip(names, (*row, row.SaleDate.date())): columns[name].append(value)
+            progress['last_sale_id'] = max(progress['last_sale_id'], row.SaleID); progress['rows'] += 1
+            if len(columns['SaleID']) >= batch_rows:
+                yield pa.RecordBatch.from_pydict(columns, schema=schema); columns = {name: [] for name in names}
+    if columns['SaleID']: yield pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+def write_sales_dataset(out_dir, file_format='parquet', full=False):
+    """
+    Writes sale lines to a hive-partitioned (sale_date=YYYY-MM-DD) Parquet or
+    Arrow IPC dataset under out_dir, zstd-compressed. Unless `full`, only sales
+    after the SaleID recorded in out_dir/_watermark.json are exported and the
+    new files are added next to the old ones. Returns the new watermark info.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    watermark_path = os.path.join(out_dir, WATERMARK_FILE)
+    if full:
+        for partition in glob.glob(os.path.join(out_dir, 'sale_date=*')): shutil.rmtree(partition)
+    os.makedirs(out_dir, exist_ok=True)
+    after_sale_id = 0
+    if not full and os.path.exists(watermark_path):
+        with open(watermark_path) as f: after_sale_id = json.load(f)['last_sale_id']
+
+    schema = _dataset_schema(pa); progress = {}; files = 0
+    # Batches are written here rather than through pyarrow.dataset.write_dataset, which
+    # would pull the generator from its own threads, outside the app context
+    for batch in line_item_batches(pa, schema, after_sale_id, progress=progress):
+        table = pa.Table.from_batches([batch])
+        for sale_date in pc.unique(table['sale_date']).to_pylist():
+            partition = table.filter(pc.equal(table['sale_date'], sale_date)).drop_columns(['sale_date'])
+            path = os.path.join(out_dir, f"sale_date={sale_date.isoformat()}")
+            os.makedirs(path, exist_ok=True)
+            path = os.path.join(path, f"part-{after_sale_id + 1}-{files}.{'parquet' if file_format == 'parquet' else 'arrow'}")
+            if file_format == 'parquet': pq.write_table(partition, path, compression='zstd')
+            else:
+                with pa.ipc.new_file(path, partition.schema, options=pa.ipc.IpcWriteOptions(compression='zstd')) as writer: writer.write_table(partition)
+            files += 1
+    info = {'last_sale_id': progress['last_sale_id'], 'rows': progress['rows'], 'exported_at': datetime.datetime.utcnow().isoformat(timespec='seconds')}
+    with open(watermark_path, 'w') as f: json.dump(info, f)
+    return info
+
+
+export_cli = AppGroup('export', help='Bulk exports for offline analytics.')
+
+@export_cli.command('sales-dataset')
+@click.argument('out_dir')
+@click.option('--format', 'file_format', type=click.Choice(['parquet', 'ipc']), default='parquet', help='Parquet (smallest) or Arrow IPC (memory-mappable).')
+@click.option('--full', is_flag=True, help='Ignore the watermark and re-export all history.')
+def sales_dataset_command(out_dir, file_format, full):
+    """Export sale line items to a date-partitioned columnar dataset (requires pyarrow)."""
+    try: info = write_sales_dataset(out_dir, file_format, full)
+    except ImportError: raise click.ClickException("pyarrow is required: pip install pyarrow")
+    click.echo(f"Exported {info['rows']} line items up to SaleID {info['last_sale_id']} into {out_dir}")
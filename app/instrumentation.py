@@ -0,0 +1,181 @@
+# app/instrumentation.py
+import bisect
+import collections
+import cProfile
+import datetime
+import io
+import pstats
+import threading
+import time
+from flask import g, request, session, current_app, has_app_context, has_request_context, Response
+from sqlalchemy import event
+from .models import db
+from .pool_metrics import pool_stats
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+# --- PROMETHEUS-STYLE METRICS ---
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    """Rendered label set, e.g. {endpoint="main.index",le="0.5"}."""
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}' if names else ''
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames, buckets):
+        self.name, self.help, self.labelnames, self.buckets = name, help_text, labelnames, buckets
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.setdefault(labels, [0] * len(self.buckets) + [0.0, 0])
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets): series[index] += 1
+            series[-2] += value; series[-1] += 1
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock: series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + ('+Inf',))} {values[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {values[-2]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {values[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames):
+        self.name, self.help, self.labelnames = name, help_text, labelnames
+        self._series = collections.Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock: self._series[labels] += amount
+
+    def expose(self):
+        with self._lock: series = sorted(self._series.items())
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"] + [f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in series]
+
+
+def _gauges(prefix, help_text, values):
+    return [line for name, value in values.items() if isinstance(value, (int, float)) and not isinstance(value, bool)
+            for line in (f"# HELP {prefix}_{name} {help_text} ({name})", f"# TYPE {prefix}_{name} gauge", f"{prefix}_{name} {value}")]
+
+
+class RequestStats:
+    """What one request spent: SQL statements and time in the database."""
+    __slots__ = ('statements', 'db_seconds')
+
+    def __init__(self):
+        self.statements = 0; self.db_seconds = 0.0
+
+
+# --- REQUEST / SQL INSTRUMENTATION ---
+class Instrumentation:
+    """
+    Per-request wall time, SQL statement count and database time, aggregated
+    into per-endpoint histograms for /metrics. Statements slower than
+    SLOW_QUERY_MS are logged with their SQL and kept in a short list. Streamed
+    responses are measured to the last byte (recorded when the response closes).
+    """
+
+    def __init__(self, recent_slow_queries=50):
+        self.requests = Counter('grocerymax_requests_total', 'Requests by endpoint, method and status.', ('endpoint', 'method', 'status'))
+        self.duration = Histogram('grocerymax_request_duration_seconds', 'Request wall time.', ('endpoint', 'method'), DURATION_BUCKETS)
+        self.db_time = Histogram('grocerymax_request_db_seconds', 'Time a request spent in SQL statements.', ('endpoint', 'method'), DURATION_BUCKETS)
+        self.statements = Histogram('grocerymax_request_sql_statements', 'SQL statements issued per request.', ('endpoint', 'method'), STATEMENT_BUCKETS)
+        self.slow = Counter('grocerymax_slow_queries_total', 'SQL statements slower than SLOW_QUERY_MS.', ('endpoint',))
+        self.slow_queries = collections.deque(maxlen=recent_slow_queries)
+
+    def init_app(self, app):
+        with app.app_context():
+            engine = db.engine
+        if not event.contains(engine, 'before_cursor_execute', self._before_cursor_execute):
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    # SQL timing: the start time rides on the execution context, so a failed statement leaves nothing behind
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None: context._instrumentation_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_instrumentation_started', None)
+        if started is None or not has_app_context(): return
+        elapsed = time.perf_counter() - started
+        stats = g.get('request_stats')
+        if stats is not None: stats.statements += 1; stats.db_seconds += elapsed
+        if elapsed * 1000 >= current_app.config.get('SLOW_QUERY_MS', 200):
+            endpoint = (request.endpoint or 'unmatched') if has_request_context() else 'background'
+            self.slow.inc((endpoint,))
+            self.slow_queries.append({'at': datetime.datetime.utcnow().isoformat(timespec='seconds'), 'endpoint': endpoint, 'ms': round(elapsed * 1000, 1), 'statement': statement[:2000]})
+            current_app.logger.warning(f"Slow query ({elapsed * 1000:.0f} ms) in {endpoint}: {' '.join(statement.split())[:500]}")
+
+    @staticmethod
+    def _start_request():
+        g.request_started = time.perf_counter(); g.request_stats = RequestStats()
+
+    def _finish_request(self, response):
+        started, stats = g.get('request_started'), g.get('request_stats')
+        # Long-lived WebSocket sessions would swamp the latency histograms
+        if started is None or request.environ.get('HTTP_UPGRADE', '').lower() == 'websocket': return response
+        labels = (request.endpoint or 'unmatched', request.method); status = str(response.status_code)
+        def record():
+            self.requests.inc(labels + (status,))
+            self.duration.observe(labels, time.perf_counter() - started)
+            self.db_time.observe(labels, stats.db_seconds); self.statements.observe(labels, stats.statements)
+        if response.is_streamed: response.call_on_close(record)
+        else: record()
+        return response
+
+    def render(self):
+        """The Prometheus text exposition of every metric, plus connection pool gauges."""
+        lines = []
+        for metric in (self.requests, self.duration, self.db_time, self.statements, self.slow): lines.extend(metric.expose())
+        lines.extend(_gauges('grocerymax_db_pool', 'Database connection pool', pool_stats(db.engine)))
+        return '\n'.join(lines) + '\n'
+
+
+instrumentation = Instrumentation()
+
+
+# --- OPT-IN PROFILING: ?_profile=1 (cProfile) or ?_profile=pyinstrument ---
+def profile_request(view, *args, **kwargs):
+    """
+    Runs a view under a profiler and returns the profile instead of the page:
+    cProfile's top functions by cumulative time as text, or pyinstrument's
+    HTML report when `_profile=pyinstrument` and it is installed.
+    """
+    if request.args.get('_profile') == 'pyinstrument':
+        try: from pyinstrument import Profiler
+        except ImportError: return Response("pyinstrument is not installed: pip install pyinstrument\n", status=501, mimetype='text/plain')
+        profiler = Profiler(); profiler.start()
+        try: view(*args, **kwargs)
+        finally: profiler.stop()
+        return Response(profiler.output_html(), mimetype='text/html')
+    profiler = cProfile.Profile()
+    profiler.runcall(view, *args, **kwargs)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(60)
+    return Response(out.getvalue(), mimetype='text/plain')
+
+
+def init_profiling(app):
+    """With PROFILING_ENABLED, lets a logged-in admin append ?_profile=1 to any page or API call to profile it."""
+    if not app.config.get('PROFILING_ENABLED'): return
+    @app.before_request
+    def maybe_profile():
+        if request.args.get('_profile') and session.get('role') == 'admin' and request.endpoint in app.view_functions:
+            return profile_request(app.view_functions[request.endpoint], **(request.view_args or {}))
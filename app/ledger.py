@@ -0,0 +1,167 @@
+# app/ledger.py
+import datetime
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import select, insert, delete, func
+from .models import db, Product, InventoryLog, StockSnapshot
+
+RECONCILIATION_CHANGE_TYPE = 'Reconciliation'
+
+
+def _interval():
+    return datetime.timedelta(hours=current_app.config.get('LEDGER_SNAPSHOT_INTERVAL_HOURS', 24))
+
+
+def _cutoff():
+    """The latest time a snapshot may be taken at: now minus LEDGER_SNAPSHOT_LAG seconds, so transactions still in flight are never cut in half."""
+    lag = datetime.timedelta(seconds=current_app.config.get('LEDGER_SNAPSHOT_LAG', 300))
+    return (datetime.datetime.utcnow() - lag).replace(microsecond=0)
+
+
+# --- READS: stock at T, movement between T1 and T2 ---
+def latest_snapshot_at(at=None):
+    """The newest snapshot time at or before `at` (any time when None), or None."""
+    query = select(func.max(StockSnapshot.SnapshotAt))
+    if at is not None: query = query.where(StockSnapshot.SnapshotAt <= at)
+    return db.session.scalar(query)
+
+
+def stock_at(at=None, product_ids=None):
+    """
+    Ledger stock per product as of `at` (everything logged so far when None):
+    the newest snapshot at or before `at` plus the InventoryLogs after it, so
+    only one snapshot interval of the log is read. Returns ({product_id:
+    quantity}, the snapshot time used or None); zero balances are left out.
+    """
+    snapshot_at = latest_snapshot_at(at)
+    totals = {}
+    if snapshot_at is not None:
+        query = select(StockSnapshot.ProductID, StockSnapshot.Quantity).where(StockSnapshot.SnapshotAt == snapshot_at)
+        if product_ids is not None: query = query.where(StockSnapshot.ProductID.in_(product_ids))
+        totals.update(db.session.execute(query).all())
+    query = select(InventoryLog.ProductID, func.sum(InventoryLog.QuantityChange)).group_by(InventoryLog.ProductID)
+    if snapshot_at is not None: query = query.where(InventoryLog.ChangeDate > snapshot_at)
+    if at is not None: query = query.where(InventoryLog.ChangeDate <= at)
+    if product_ids is not None: query = query.where(InventoryLog.ProductID.in_(product_ids))
+    for product_id, change in db.session.execute(query): totals[product_id] = totals.get(product_id, 0) + int(change or 0)
+    return {product_id: quantity for product_id, quantity in totals.items() if quantity}, snapshot_at
+
+
+def movement(start, end, product_ids=None):
+    """
+    Stock movement in (start, end]: per product the opening and closing
+    balance and the net change by ChangeType. Reads one snapshot interval
+    plus the entries in the range. Products with no stock and no movement
+    are left out unless asked for.
+    """
+    opening, _ = stock_at(start, product_ids)
+    report = {product_id: {'opening': quantity, 'closing': quantity, 'changes': {}} for product_id, quantity in opening.items()}
+    for product_id in product_ids or (): report.setdefault(product_id, {'opening': 0, 'closing': 0, 'changes': {}})
+    query = (select(InventoryLog.ProductID, InventoryLog.ChangeType, func.sum(InventoryLog.QuantityChange))
+             .where(InventoryLog.ChangeDate > start, InventoryLog.ChangeDate <= end).group_by(InventoryLog.ProductID, InventoryLog.ChangeType))
+    if product_ids is not None: query = query.where(InventoryLog.ProductID.in_(product_ids))
+    for product_id, change_type, change in db.session.execute(query):
+        entry = report.setdefault(product_id, {'opening': 0, 'closing': 0, 'changes': {}})
+        entry['changes'][change_type] = int(change or 0); entry['closing'] += int(change or 0)
+    return report
+
+
+# --- SNAPSHOTS ---
+def take_snapshot(at=None):
+    """
+    Writes every product's ledger balance as of `at` (default: the latest safe
+    time, see _cutoff), built from the previous snapshot rather than the whole
+    log. Replaces a snapshot already taken at that time. The caller commits.
+    Returns (snapshot time, rows written).
+    """
+    cutoff = _cutoff()
+    at = cutoff if at is None else at.replace(microsecond=0)
+    if at > cutoff: raise ValueError(f"Snapshots can't be taken after {cutoff} (now minus LEDGER_SNAPSHOT_LAG); transactions may still be writing to it.")
+    db.session.execute(delete(StockSnapshot).where(StockSnapshot.SnapshotAt == at))
+    totals, _ = stock_at(at)
+    if totals: db.session.execute(insert(StockSnapshot), [{'ProductID': product_id, 'SnapshotAt': at, 'Quantity': quantity} for product_id, quantity in sorted(totals.items())])
+    return at, len(totals)
+
+
+def snapshot_due():
+    """True when the newest snapshot is at least LEDGER_SNAPSHOT_INTERVAL_HOURS old (or there is none)."""
+    latest = latest_snapshot_at()
+    return latest is None or _cutoff() - latest >= _interval()
+
+
+def rebuild(since, every=None):
+    """
+    Drops the snapshots from `since` on and retakes them every `every`
+    (default LEDGER_SNAPSHOT_INTERVAL_HOURS) up to now, each built on the one
+    before: backfills history, or repairs snapshots that entries were
+    backdated past. The caller commits. Returns the number taken.
+    """
+    every = every or _interval(); cutoff = _cutoff()
+    db.session.execute(delete(StockSnapshot).where(StockSnapshot.SnapshotAt >= since))
+    taken, at = 0, since.replace(microsecond=0)
+    while at <= cutoff: take_snapshot(at); taken += 1; at += every
+    return taken
+
+
+# --- RECONCILIATION ---
+def reconcile(deep=False):
+    """
+    Compares every product's StockQuantity with its ledger balance and reports
+    the ones that disagree. With `deep`, also re-sums the whole log up to the
+    newest snapshot and reports products that snapshot no longer matches
+    (fix those with rebuild()). Run it inside one transaction so both sides
+    are read from the same point in time.
+    """
+    ledger, snapshot_at = stock_at()
+    products = db.session.execute(select(Product.ProductID, Product.ProductName, Product.StockQuantity).order_by(Product.ProductID)).all()
+    drifted = [{'product_id': p.ProductID, 'product_name': p.ProductName, 'stock_quantity': p.StockQuantity or 0,
+                'ledger_quantity': ledger.get(p.ProductID, 0), 'drift': (p.StockQuantity or 0) - ledger.get(p.ProductID, 0)}
+               for p in products if (p.StockQuantity or 0) != ledger.get(p.ProductID, 0)]
+    report = {'checked': len(products), 'snapshot_at': snapshot_at.isoformat() if snapshot_at else None, 'drifted': drifted}
+    if deep and snapshot_at is not None:
+        snapshot = dict(db.session.execute(select(StockSnapshot.ProductID, StockSnapshot.Quantity).where(StockSnapshot.SnapshotAt == snapshot_at)).all())
+        full = {product_id: int(total) for product_id, total in db.session.execute(
+            select(InventoryLog.ProductID, func.sum(InventoryLog.QuantityChange)).where(InventoryLog.ChangeDate <= snapshot_at).group_by(InventoryLog.ProductID)) if total}
+        report['stale_snapshot'] = [{'product_id': product_id, 'snapshot_quantity': snapshot.get(product_id, 0), 'ledger_quantity': full.get(product_id, 0)}
+                                    for product_id in sorted(set(snapshot) | set(full)) if snapshot.get(product_id, 0) != full.get(product_id, 0)]
+    return report
+
+
+def record_drift(drifted, notes='Ledger reconciliation'):
+    """Appends a Reconciliation entry per drifted product so its ledger matches StockQuantity again. The caller commits."""
+    if drifted: db.session.execute(insert(InventoryLog), [
+        {'ProductID': d['product_id'], 'ChangeType': RECONCILIATION_CHANGE_TYPE, 'QuantityChange': d['drift'], 'Notes': notes} for d in drifted])
+
+
+# --- CLI: flask ledger snapshot | reconcile ---
+ledger_cli = AppGroup('ledger', help='Inventory ledger snapshots and reconciliation.')
+
+@ledger_cli.command('snapshot')
+@click.option('--at', type=click.DateTime(), default=None, help='Snapshot time in UTC (default: now minus LEDGER_SNAPSHOT_LAG).')
+@click.option('--since', type=click.DateTime(), default=None, help='Rebuild the snapshots from this time on, one per interval.')
+@click.option('--every-hours', type=float, default=None, help='Interval for --since (default LEDGER_SNAPSHOT_INTERVAL_HOURS).')
+@click.option('--if-due', is_flag=True, help='Do nothing unless the newest snapshot is at least one interval old (for cron).')
+def snapshot_command(at, since, every_hours, if_due):
+    """Take a stock snapshot, or rebuild a range of them."""
+    if since:
+        taken = rebuild(since, datetime.timedelta(hours=every_hours) if every_hours else None); db.session.commit()
+        click.echo(f"{taken} snapshots taken from {since}"); return
+    if if_due and not snapshot_due(): click.echo("Snapshot not due yet."); return
+    try: at, rows = take_snapshot(at)
+    except ValueError as e: raise click.UsageError(str(e))
+    db.session.commit()
+    click.echo(f"Snapshot at {at}: {rows} products")
+
+@ledger_cli.command('reconcile')
+@click.option('--deep', is_flag=True, help='Also check the newest snapshot against the full log.')
+@click.option('--record', is_flag=True, help='Append Reconciliation entries so the ledger matches StockQuantity again.')
+def reconcile_command(deep, record):
+    """Report products whose StockQuantity and ledger disagree; exits 1 on drift unless --record."""
+    report = reconcile(deep)
+    for d in report['drifted']: click.echo(f"#{d['product_id']} {d['product_name']}: stock {d['stock_quantity']}, ledger {d['ledger_quantity']} (drift {d['drift']:+d})")
+    for s in report.get('stale_snapshot', []): click.echo(f"#{s['product_id']}: snapshot {s['snapshot_quantity']}, log {s['ledger_quantity']} at {report['snapshot_at']}")
+    click.echo(f"{len(report['drifted'])} of {report['checked']} products drifted" + (f", {len(report['stale_snapshot'])} stale in the newest snapshot" if 'stale_snapshot' in report else ''))
+    if record and report['drifted']:
+        record_drift(report['drifted']); db.session.commit(); click.echo(f"Recorded {len(report['drifted'])} Reconciliation entries.")
+    if (report['drifted'] and not record) or report.get('stale_snapshot'): raise SystemExit(1)
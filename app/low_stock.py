@@ -0,0 +1,137 @@
+# app/low_stock.py
+import json
+import threading
+from sqlalchemy import select, event, func
+from .models import db, Product, Supplier
+
+READ_CHUNK = 1000
+LOAD_ATTEMPTS = 3
+alert_clients = {}    # ws -> WebSocketClient, admin browsers on /ws/alerts
+
+
+def levels_query(default_point):
+    """Each product's stock with its effective reorder point and quantity (product's, else supplier's, else the default point)."""
+    return (select(Product.ProductID, Product.ProductName, Product.Price, Product.StockQuantity, Product.SupplierID,
+                   func.coalesce(Product.ReorderPoint, Supplier.ReorderPoint, default_point).label('ReorderPoint'),
+                   func.coalesce(Product.ReorderQuantity, Supplier.ReorderQuantity).label('ReorderQuantity'))
+            .outerjoin(Supplier, Product.SupplierID == Supplier.SupplierID))
+
+
+def _item(row):
+    return {'product_id': row.ProductID, 'product_name': row.ProductName, 'price': float(row.Price) if row.Price is not None else None,
+            'stock': row.StockQuantity, 'reorder_point': row.ReorderPoint, 'reorder_quantity': row.ReorderQuantity, 'supplier_id': row.SupplierID}
+
+
+class LowStockWatcher:
+    """
+    The products below their reorder point, kept in the app process.
+
+    Loaded with one scan on first use and then maintained incrementally.
+    ORM changes to products and suppliers are noticed at flush; set-based
+    writers (checkout, receiving, bulk updates, imports) call track(). Just
+    before such a transaction commits only those rows are re-read, and once
+    it has committed, products that crossed their reorder point either way
+    move in or out of the set and are pushed to admin browsers on /ws/alerts.
+    Per process, like the barcode cache.
+    """
+
+    def __init__(self, default_point=10):
+        self.default_point = default_point
+        self.crossings = 0
+        self._items = {}    # product_id -> item dict
+        self._loaded = False
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def init_app(self, app, session):
+        self.default_point = app.config.get('LOW_STOCK_REORDER_POINT', self.default_point)
+        if self._listening: return
+        self._listening = True
+        event.listen(session, 'after_flush', self._track_flush)
+        event.listen(session, 'before_commit', self._read_tracked)
+        event.listen(session, 'after_commit', self._apply_committed)
+        event.listen(session, 'after_soft_rollback', self._discard)
+
+    # --- reads ---
+    def load(self):
+        """(Re)builds the set with one scan of Products."""
+        for attempt in range(LOAD_ATTEMPTS):
+            with self._lock: generation = self._generation
+            rows = db.session.execute(levels_query(self.default_point).where(
+                Product.StockQuantity < func.coalesce(Product.ReorderPoint, Supplier.ReorderPoint, self.default_point))).all()
+            with self._lock:
+                # A commit applied while we were reading may be missing from `rows`: read again, but under
+                # constant writes settle for the last read (the next write to a product corrects it)
+                if generation != self._generation and attempt < LOAD_ATTEMPTS - 1: continue
+                self._items = {row.ProductID: _item(row) for row in rows}; self._loaded = True; self._generation += 1
+                return
+
+    def items(self):
+        """Low products, lowest stock first."""
+        if not self._loaded: self.load()
+        with self._lock: items = list(self._items.values())
+        return sorted(items, key=lambda item: (item['stock'], item['product_id']))
+
+    def count(self):
+        if not self._loaded: self.load()
+        return len(self._items)
+
+    def clear(self):
+        with self._lock: self._items = {}; self._generation += 1
+
+    def stats(self):
+        return {'loaded': self._loaded, 'low': len(self._items), 'crossings': self.crossings, 'admin_clients': len(alert_clients)}
+
+    # --- tracking writes ---
+    @staticmethod
+    def track(product_ids=(), supplier_ids=()):
+        """Marks products (or every product of a supplier) whose stock or reorder point the current transaction changed."""
+        tracked = db.session.info.setdefault('low_stock_tracked', (set(), set()))
+        tracked[0].update(product_ids); tracked[1].update(supplier_ids)
+
+    def _track_flush(self, session, flush_context):
+        products = [obj.ProductID for obj in list(session.new) + list(session.dirty) + list(session.deleted) if isinstance(obj, Product)]
+        suppliers = [obj.SupplierID for obj in session.dirty if isinstance(obj, Supplier)]
+        if products or suppliers:
+            tracked = session.info.setdefault('low_stock_tracked', (set(), set()))
+            tracked[0].update(products); tracked[1].update(suppliers)
+
+    def _read_tracked(self, session):
+        session.flush()    # commit would flush next anyway; doing it first tracks pending ORM changes and lets the read below see them
+        tracked = session.info.pop('low_stock_tracked', None)
+        if tracked is None: return
+        product_ids, supplier_ids = tracked
+        if not self._loaded: return
+        query = levels_query(self.default_point); rows = []; product_ids = sorted(product_ids)
+        for start in range(0, len(product_ids), READ_CHUNK):
+            rows += session.execute(query.where(Product.ProductID.in_(product_ids[start:start + READ_CHUNK]))).all()
+        if supplier_ids: rows += session.execute(query.where(Product.SupplierID.in_(supplier_ids))).all()
+        session.info['low_stock_levels'] = (product_ids, rows)
+
+    def _apply_committed(self, session):
+        levels = session.info.pop('low_stock_levels', None)
+        if levels is None: return
+        product_ids, rows = levels; alerts = []
+        with self._lock:
+            for product_id in set(product_ids) - {row.ProductID for row in rows}: self._items.pop(product_id, None)   # deleted
+            for row in rows:
+                item = _item(row); was_low = row.ProductID in self._items; is_low = row.StockQuantity < row.ReorderPoint
+                if is_low: self._items[row.ProductID] = item
+                else: self._items.pop(row.ProductID, None)
+                if is_low != was_low: alerts.append({'type': 'low_stock' if is_low else 'restocked', **item})
+            self._generation += 1; self.crossings += len(alerts)
+        for alert in alerts: self.push(alert)
+
+    @staticmethod
+    def _discard(session, previous_transaction):
+        session.info.pop('low_stock_tracked', None); session.info.pop('low_stock_levels', None)
+
+    @staticmethod
+    def push(message):
+        """Queues a message for every admin browser on /ws/alerts (never blocks on a slow one)."""
+        message = json.dumps(message)
+        for client in list(alert_clients.values()): client.enqueue(message)
+
+
+low_stock = LowStockWatcher()
@@ -35,23 +35,26 @@ class Product(db.Model):
     StockQuantity = db.Column(db.Integer, nullable=False, default=0)
     Barcode = db.Column(db.String(100), unique=True, nullable=True)
     SupplierID = db.Column(db.Integer, db.ForeignKey('Suppliers.SupplierID'), nullable=True)
+    ReorderPoint = db.Column(db.Integer, nullable=True)     # Low when stock falls below this; None = supplier's, then LOW_STOCK_REORDER_POINT
+    ReorderQuantity = db.Column(db.Integer, nullable=True)  # How many to order when low; None = supplier's
     LastUpdated = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
 class Customer(db.Model):
     __tablename__ = 'Customers'
     CustomerID = db.Column(db.Integer, primary_key=True)
-    FirstName = db.Column(db.String(100), nullable=False)
-    LastName = db.Column(db.String(100))
+    FirstName = db.Column(db.String(100), nullable=False, index=True)
+    LastName = db.Column(db.String(100), index=True)
     Email = db.Column(db.String(255), unique=True)
-    PhoneNumber = db.Column(db.String(20))
+    PhoneNumber = db.Column(db.String(20), index=True)
     Address = db.Column(db.Text)
     RegistrationDate = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow)
 
 class Sale(db.Model):
     __tablename__ = 'Sales'
+    __table_args__ = (db.Index('ix_Sales_CustomerID_SaleDate', 'CustomerID', 'SaleDate'),)
     SaleID = db.Column(db.Integer, primary_key=True)
     CustomerID = db.Column(db.Integer, db.ForeignKey('Customers.CustomerID'), nullable=True)
-    SaleDate = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow)
+    SaleDate = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow, index=True)
     TotalAmount = db.Column(db.Numeric(10, 2), nullable=False)
     PaymentMethod = db.Column(db.String(50))
     Customer = db.relationship('Customer', backref='sales')
@@ -61,8 +64,8 @@ class Sale(db.Model):
 class SaleDetail(db.Model):
     __tablename__ = 'SaleDetails'
     SaleDetailID = db.Column(db.Integer, primary_key=True)
-    SaleID = db.Column(db.Integer, db.ForeignKey('Sales.SaleID'), nullable=False)
-    ProductID = db.Column(db.Integer, db.ForeignKey('Products.ProductID'), nullable=False)
+    SaleID = db.Column(db.Integer, db.ForeignKey('Sales.SaleID'), nullable=False, index=True)
+    ProductID = db.Column(db.Integer, db.ForeignKey('Products.ProductID'), nullable=False, index=True)
     Quantity = db.Column(db.Integer, nullable=False)
     UnitPrice = db.Column(db.Numeric(10, 2), nullable=False)
     TotalPrice = db.Column(db.Numeric(10, 2), nullable=False)
@@ -76,14 +79,17 @@ class Supplier(db.Model):
     PhoneNumber = db.Column(db.String(20))
     Email = db.Column(db.String(255))
     Address = db.Column(db.Text)
+    ReorderPoint = db.Column(db.Integer, nullable=True)     # Defaults for this supplier's products
+    ReorderQuantity = db.Column(db.Integer, nullable=True)
     Products = db.relationship('Product', backref='Supplier', lazy=True)
 
 class InventoryLog(db.Model):
     __tablename__ = 'InventoryLogs'
+    __table_args__ = (db.Index('ix_InventoryLogs_ProductID_ChangeDate', 'ProductID', 'ChangeDate'),)
     LogID = db.Column(db.Integer, primary_key=True)
     ProductID = db.Column(db.Integer, db.ForeignKey('Products.ProductID'), nullable=False)
     SaleID = db.Column(db.Integer, db.ForeignKey('Sales.SaleID'), nullable=True)
-    ChangeDate = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow)
+    ChangeDate = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow, index=True)
     ChangeType = db.Column(db.String(50), nullable=False) # e.g., 'Sale', 'Manual Adjustment', 'Initial Stock'
     QuantityChange = db.Column(db.Integer, nullable=False)
     Notes = db.Column(db.Text)
@@ -94,7 +100,7 @@ class PurchaseOrder(db.Model):
     PO_ID = db.Column(db.Integer, primary_key=True)
     SupplierID = db.Column(db.Integer, db.ForeignKey('Suppliers.SupplierID'), nullable=False)
     OrderDate = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow)
-    Status = db.Column(db.String(50), nullable=False, default='Pending') # Pending, Completed
+    Status = db.Column(db.String(50), nullable=False, default='Pending') # Draft (see app/replenishment.py), Pending, Partially Received, Completed
     TotalCost = db.Column(db.Numeric(10, 2), nullable=True)
     Supplier = db.relationship('Supplier', backref='purchase_orders')
     Details = db.relationship('PurchaseOrderDetail', backref='purchase_order', cascade="all, delete-orphan")
@@ -105,5 +111,37 @@ class PurchaseOrderDetail(db.Model):
     PO_ID = db.Column(db.Integer, db.ForeignKey('PurchaseOrders.PO_ID'), nullable=False)
     ProductID = db.Column(db.Integer, db.ForeignKey('Products.ProductID'), nullable=False)
     Quantity = db.Column(db.Integer, nullable=False)
+    ReceivedQuantity = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     CostPerItem = db.Column(db.Numeric(10, 2), nullable=True) # Cost from supplier
-    Product = db.relationship('Product')
\ No newline at end of file
+    Product = db.relationship('Product')
+
+# --- DAILY SALES ROLLUPS (derived from Sales/SaleDetails, see app/rollup.py) ---
+class DailySales(db.Model):
+    __tablename__ = 'DailySales'
+    SaleDay = db.Column(db.Date, primary_key=True)
+    Revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    TransactionCount = db.Column(db.Integer, nullable=False, default=0)
+
+class DailyProductSales(db.Model):
+    __tablename__ = 'DailyProductSales'
+    SaleDay = db.Column(db.Date, primary_key=True)
+    ProductID = db.Column(db.Integer, primary_key=True, index=True)
+    Revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    Quantity = db.Column(db.Integer, nullable=False, default=0)
+    TransactionCount = db.Column(db.Integer, nullable=False, default=0)
+
+class DailyCategorySales(db.Model):
+    __tablename__ = 'DailyCategorySales'
+    SaleDay = db.Column(db.Date, primary_key=True)
+    CategoryID = db.Column(db.Integer, primary_key=True, index=True)
+    Revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    Quantity = db.Column(db.Integer, nullable=False, default=0)
+    TransactionCount = db.Column(db.Integer, nullable=False, default=0)
+
+# --- STOCK SNAPSHOTS (derived from InventoryLogs, see app/ledger.py) ---
+class StockSnapshot(db.Model):
+    __tablename__ = 'StockSnapshots'
+    # Every product's ledger balance as of SnapshotAt; products with a zero balance have no row
+    ProductID = db.Column(db.Integer, primary_key=True)
+    SnapshotAt = db.Column(db.TIMESTAMP, primary_key=True, index=True)
+    Quantity = db.Column(db.Integer, nullable=False)
@@ -0,0 +1,67 @@
+# app/pool_metrics.py
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+SLOW_WAIT_SECONDS = 0.1
+
+
+class PoolMetrics:
+    """Counters for one engine's pool: checkouts, time spent getting a connection, timeouts, new and invalidated connections."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = self.slow_waits = self.timeouts = self.connects = self.invalidated = 0
+        self.wait_total = self.wait_max = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            if timed_out: self.timeouts += 1
+            else: self.checkouts += 1
+            self.wait_total += seconds; self.wait_max = max(self.wait_max, seconds)
+            if seconds >= SLOW_WAIT_SECONDS: self.slow_waits += 1
+
+    def count(self, name):
+        with self._lock: setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self):
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {'checkouts': self.checkouts, 'timeouts': self.timeouts, 'connects': self.connects, 'invalidated': self.invalidated,
+                    'wait_ms_avg': round(self.wait_total / attempts * 1000, 3) if attempts else 0.0, 'wait_ms_max': round(self.wait_max * 1000, 3),
+                    f'waits_over_{int(SLOW_WAIT_SECONDS * 1000)}ms': self.slow_waits}
+
+
+class MeteredQueuePool(QueuePool):
+    """
+    QueuePool that times every connect(): the wait for a free slot, opening an
+    overflow connection and the pre-ping, i.e. how long a request was held up
+    before it could run its first statement.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        started = time.perf_counter()
+        try: connection = super().connect()
+        except exc.TimeoutError: self.metrics.record_wait(time.perf_counter() - started, timed_out=True); raise
+        self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep counting into the same metrics
+        pool = super().recreate(); pool.metrics = self.metrics
+        return pool
+
+
+def pool_stats(engine):
+    """Live occupancy of the engine's pool plus its metrics (when metered), as served by /api/db_pool/stats."""
+    pool = engine.pool
+    stats = {'pool': type(pool).__name__, 'driver': f"{engine.dialect.name}+{engine.dialect.driver}"}
+    if isinstance(pool, QueuePool):
+        stats.update(size=pool.size(), checked_out=pool.checkedout(), idle=pool.checkedin(), overflow=max(pool.overflow(), 0), timeout=pool.timeout())
+    if isinstance(pool, MeteredQueuePool): stats.update(pool.metrics.as_dict())
+    return stats
@@ -0,0 +1,131 @@
+# app/queries.py
+import datetime
+from functools import wraps
+import click
+from flask import g, request, current_app, abort
+from flask.cli import AppGroup
+from sqlalchemy import event, select
+from sqlalchemy.orm import joinedload, selectinload
+from .models import db, Sale, SaleDetail, PurchaseOrder, PurchaseOrderDetail, InventoryLog
+
+HISTORY_PAGE_SIZE = 50
+
+# --- LOADER STRATEGIES ---
+# Many-to-one parents ride along in the same SELECT (joinedload); collections are
+# fetched with one extra IN query per relationship (selectinload), with the
+# line's product joined into that query.
+SALE_LINES = (joinedload(Sale.Customer), selectinload(Sale.SaleDetails).joinedload(SaleDetail.Product))
+PURCHASE_ORDER_LINES = (joinedload(PurchaseOrder.Supplier), selectinload(PurchaseOrder.Details).joinedload(PurchaseOrderDetail.Product))
+
+
+def sale_with_lines(sale_id):
+    """Sale, its customer and every line with its product, in two statements."""
+    return Sale.query.options(*SALE_LINES).filter(Sale.SaleID == sale_id).first_or_404()
+
+
+def sales_listing():
+    return Sale.query.options(joinedload(Sale.Customer))
+
+
+def purchase_orders_listing():
+    return PurchaseOrder.query.options(joinedload(PurchaseOrder.Supplier)).order_by(PurchaseOrder.OrderDate.desc())
+
+
+def purchase_order_with_lines(po_id):
+    return PurchaseOrder.query.options(*PURCHASE_ORDER_LINES).filter(PurchaseOrder.PO_ID == po_id).first_or_404()
+
+
+def customer_sales(customer_id):
+    return Sale.query.filter(Sale.CustomerID == customer_id)
+
+
+def sales_page(query, args, page_size=HISTORY_PAGE_SIZE):
+    """
+    One keyset page of a Sale query, newest first by (SaleDate, SaleID), resuming
+    after ?before_date=&before_id=. Returns (sales, next_cursor, page_totals).
+    The leading SaleDate <= bound keeps the predicate a plain index range scan.
+    """
+    before_date = args.get('before_date'); before_id = args.get('before_id', type=int)
+    if before_date and before_id:
+        try: before_date = datetime.datetime.fromisoformat(before_date)
+        except ValueError: abort(400)
+        query = query.filter(Sale.SaleDate <= before_date, db.or_(Sale.SaleDate < before_date, Sale.SaleID < before_id))
+    rows = query.order_by(Sale.SaleDate.desc(), Sale.SaleID.desc()).limit(page_size + 1).all()
+    page = rows[:page_size]
+    next_cursor = {'before_date': page[-1].SaleDate.isoformat(), 'before_id': page[-1].SaleID} if len(rows) > page_size else None
+    return page, next_cursor, {'count': len(page), 'amount': sum(sale.TotalAmount or 0 for sale in page)}
+
+
+# --- STATEMENT BUDGETS ---
+class StatementBudgetExceeded(Exception):
+    pass
+
+
+def statement_count():
+    """SQL statements sent to the database so far in the current request (counted by app/instrumentation.py)."""
+    stats = g.get('request_stats')
+    return stats.statements if stats is not None else 0
+
+
+def statement_budget(limit):
+    """
+    Caps the SQL statements a page render (GET) may issue, template included.
+    Going over logs a warning, or raises StatementBudgetExceeded when
+    SQL_STATEMENT_BUDGET_STRICT is set so an N+1 regression fails loudly in
+    development and CI instead of quietly slowing the view down.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'): return view(*args, **kwargs)
+            start = statement_count()
+            response = view(*args, **kwargs)
+            used = statement_count() - start
+            if used > limit:
+                message = f"{request.endpoint} issued {used} SQL statements (budget {limit})"
+                if current_app.config.get('SQL_STATEMENT_BUDGET_STRICT'): raise StatementBudgetExceeded(message)
+                current_app.logger.warning(message)
+            return response
+        return wrapped
+    return decorator
+
+
+# --- INDEX CHECK: flask queries explain ---
+def explain(statement):
+    """The database's plan for `statement` (EXPLAIN, or EXPLAIN QUERY PLAN on SQLite) as a list of row tuples."""
+    prefix = 'EXPLAIN QUERY PLAN ' if db.engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    def add_prefix(conn, cursor, sql, parameters, context, executemany): return prefix + sql, parameters
+    with db.engine.connect() as conn:
+        event.listen(conn, 'before_cursor_execute', add_prefix, retval=True)
+        return [tuple(row) for row in conn.execute(statement)]
+
+
+def indexed_queries():
+    """(description, statement, index it must use) for the hot history/lookup queries."""
+    now = datetime.datetime.utcnow(); week_ago = now - datetime.timedelta(days=7)
+    history = sales_listing().filter(Sale.SaleDate >= week_ago, Sale.SaleDate < now)
+    return [
+        ('sales history page', history.order_by(Sale.SaleDate.desc(), Sale.SaleID.desc()).limit(HISTORY_PAGE_SIZE + 1).statement, 'ix_Sales_SaleDate'),
+        ('customer history page', customer_sales(1).filter(Sale.SaleDate <= now).order_by(Sale.SaleDate.desc(), Sale.SaleID.desc()).limit(HISTORY_PAGE_SIZE + 1).statement, 'ix_Sales_CustomerID_SaleDate'),
+        ('sale lines', select(SaleDetail).where(SaleDetail.SaleID.in_([1, 2, 3])), 'ix_SaleDetails_SaleID'),
+        ('product sale lines', select(SaleDetail).where(SaleDetail.ProductID == 1), 'ix_SaleDetails_ProductID'),
+        ('product inventory history', select(InventoryLog).where(InventoryLog.ProductID == 1, InventoryLog.ChangeDate >= week_ago).order_by(InventoryLog.ChangeDate), 'ix_InventoryLogs_ProductID_ChangeDate'),
+        ('inventory changes by date', select(InventoryLog).where(InventoryLog.ChangeDate >= week_ago), 'ix_InventoryLogs_ChangeDate'),
+    ]
+
+
+queries_cli = AppGroup('queries', help='Query plan checks.')
+
+@queries_cli.command('explain')
+def explain_command():
+    """Fail unless every hot query's plan uses its index (run against realistically sized data)."""
+    failures = 0
+    for description, statement, index in indexed_queries():
+        plan = explain(statement)
+        used = index in ' '.join(str(value) for row in plan for value in row)
+        failures += not used
+        click.echo(f"{'ok  ' if used else 'FAIL'} {description}: expected {index}")
+        if not used:
+            for row in plan: click.echo(f"       {row}")
+    if failures: raise click.ClickException(f"{failures} quer{'y' if failures == 1 else 'ies'} not using the expected index")
+
@@ -0,0 +1,65 @@
+# app/receiving.py
+from sqlalchemy import select, update, insert, case
+from .models import db, Product, PurchaseOrder, PurchaseOrderDetail, InventoryLog
+from .low_stock import low_stock
+
+
+class ReceivingError(Exception):
+    pass
+
+
+def receive_purchase_order(po_id, received=None):
+    """
+    Books a delivery against a purchase order in a fixed number of statements.
+
+    `received` maps PODetail_ID -> quantity arriving now; None receives every
+    line's outstanding quantity. The PO row is locked first, so a double submit
+    waits and then finds nothing left to receive instead of doubling stock.
+    Line progress and stock are each updated with one set-based UPDATE and the
+    InventoryLogs rows are bulk-inserted. The caller owns the transaction:
+    commit on success, rollback on ReceivingError. Returns (po, product_ids).
+    """
+    po = db.session.execute(select(PurchaseOrder).where(PurchaseOrder.PO_ID == po_id).with_for_update()).scalar_one_or_none()
+    if po is None: raise ReceivingError("Purchase order not found.")
+    if po.Status == 'Completed': raise ReceivingError("Order already completed.")
+    if po.Status == 'Draft': raise ReceivingError("Approve this draft before receiving it.")
+
+    lines = db.session.execute(
+        select(PurchaseOrderDetail.PODetail_ID, PurchaseOrderDetail.ProductID, PurchaseOrderDetail.Quantity, PurchaseOrderDetail.ReceivedQuantity)
+        .where(PurchaseOrderDetail.PO_ID == po_id).order_by(PurchaseOrderDetail.PODetail_ID)
+    ).all()
+    if received is not None and set(received) - {line.PODetail_ID for line in lines}: raise ReceivingError("Unknown order line.")
+
+    arriving, product_deltas, outstanding_after = {}, {}, 0
+    for line in lines:
+        outstanding = line.Quantity - line.ReceivedQuantity
+        quantity = outstanding if received is None else received.get(line.PODetail_ID, 0)
+        if quantity < 0: raise ReceivingError("Received quantities cannot be negative.")
+        if quantity > outstanding: raise ReceivingError(f"Line {line.PODetail_ID}: only {outstanding} left to receive.")
+        outstanding_after += outstanding - quantity
+        if quantity:
+            arriving[line.PODetail_ID] = quantity
+            product_deltas[line.ProductID] = product_deltas.get(line.ProductID, 0) + quantity
+    if not arriving: raise ReceivingError("Nothing to receive.")
+
+    db.session.execute(
+        update(PurchaseOrderDetail)
+        .where(PurchaseOrderDetail.PODetail_ID.in_(arriving))
+        .values(ReceivedQuantity=PurchaseOrderDetail.ReceivedQuantity + case(arriving, value=PurchaseOrderDetail.PODetail_ID))
+        .execution_options(synchronize_session=False)
+    )
+    product_ids = sorted(product_deltas)
+    db.session.execute(
+        update(Product)
+        .where(Product.ProductID.in_(product_ids))
+        .values(StockQuantity=Product.StockQuantity + case(product_deltas, value=Product.ProductID))
+        .execution_options(synchronize_session=False)
+    )
+    low_stock.track(product_ids)
+    partial = '' if outstanding_after == 0 else ' (partial)'
+    db.session.execute(insert(InventoryLog), [
+        {'ProductID': product_id, 'ChangeType': 'Purchase Order', 'QuantityChange': product_deltas[product_id], 'Notes': f"PO #{po.PO_ID}{partial}"}
+        for product_id in product_ids
+    ])
+    po.Status = 'Completed' if outstanding_after == 0 else 'Partially Received'
+    return po, product_ids
@@ -0,0 +1,128 @@
+# app/replenishment.py
+import datetime
+import math
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import select, insert, delete, func
+from .models import db, Product, PurchaseOrder, PurchaseOrderDetail, DailyProductSales
+from .low_stock import levels_query
+from .exports import iter_rows
+
+DRAFT_STATUS = 'Draft'
+OPEN_STATUSES = ('Pending', 'Partially Received')   # Orders whose outstanding quantity is already on its way
+DETAIL_CHUNK = 5000
+
+
+class ReplenishmentPlan:
+    def __init__(self):
+        self.lines = []         # one dict per product to order
+        self.unassigned = []    # products that need ordering but have no supplier
+        self.products = 0
+        self.timings = {}
+
+    def by_supplier(self):
+        suppliers = {}
+        for line in self.lines: suppliers.setdefault(line['supplier_id'], []).append(line)
+        return suppliers
+
+    def as_dict(self):
+        return {'products': self.products, 'lines': len(self.lines), 'suppliers': len(self.by_supplier()),
+                'unassigned': self.unassigned, 'timings': self.timings}
+
+
+# --- SALES VELOCITY ---
+def sales_velocity(today=None, lookback_days=None, recent_days=None, recent_weight=None):
+    """
+    {product_id: units sold per day} from the DailyProductSales rollup in one
+    grouped query, so the database hands back one row per product however
+    long the history. The rate blends the last `recent_days` with the whole
+    lookback, each over the product's selling life if that is shorter (a new
+    line isn't averaged away over a year it wasn't stocked). Today is left
+    out as it's only partly sold.
+    """
+    config = current_app.config
+    today = today or datetime.date.today()
+    lookback_days = lookback_days or config.get('REPLENISH_LOOKBACK_DAYS', 365)
+    recent_days = recent_days or config.get('REPLENISH_RECENT_DAYS', 28)
+    recent_weight = config.get('REPLENISH_RECENT_WEIGHT', 0.5) if recent_weight is None else recent_weight
+    since = today - datetime.timedelta(days=lookback_days); recent_since = today - datetime.timedelta(days=recent_days)
+    recent = func.sum(db.case((DailyProductSales.SaleDay >= recent_since, DailyProductSales.Quantity), else_=0))
+    query = (select(DailyProductSales.ProductID, func.sum(DailyProductSales.Quantity), recent, func.min(DailyProductSales.SaleDay))
+             .where(DailyProductSales.SaleDay >= since, DailyProductSales.SaleDay < today).group_by(DailyProductSales.ProductID))
+    velocity = {}
+    for product_id, total, recent_total, first_day in iter_rows(query):
+        life = (today - first_day).days
+        velocity[product_id] = recent_weight * float(recent_total or 0) / min(recent_days, life) + (1 - recent_weight) * float(total or 0) / life
+    return velocity
+
+
+# --- PLANNING ---
+def plan(today=None):
+    """
+    Works out what to order, in one streamed pass over the catalog. A product
+    is ordered when its stock plus what's already on order won't last the
+    supplier lead time at its current velocity, or is below its reorder point.
+    It is then topped up to cover REPLENISH_LEAD_TIME_DAYS + REPLENISH_COVER_DAYS
+    of sales, and to at least its reorder quantity.
+    """
+    config = current_app.config
+    lead_days = config.get('REPLENISH_LEAD_TIME_DAYS', 7); cover_days = config.get('REPLENISH_COVER_DAYS', 14)
+    result = ReplenishmentPlan(); started = time.perf_counter()
+    velocity = sales_velocity(today)
+    result.timings['velocity_s'] = round(time.perf_counter() - started, 3)
+
+    on_order = (select(PurchaseOrderDetail.ProductID, func.sum(PurchaseOrderDetail.Quantity - PurchaseOrderDetail.ReceivedQuantity).label('OnOrder'))
+                .join(PurchaseOrder, PurchaseOrderDetail.PO_ID == PurchaseOrder.PO_ID).where(PurchaseOrder.Status.in_(OPEN_STATUSES))
+                .group_by(PurchaseOrderDetail.ProductID).subquery())
+    catalog = (levels_query(config.get('LOW_STOCK_REORDER_POINT', 10)).add_columns(func.coalesce(on_order.c.OnOrder, 0).label('OnOrder'))
+               .outerjoin(on_order, on_order.c.ProductID == Product.ProductID))
+    for row in iter_rows(catalog):
+        result.products += 1
+        rate = velocity.get(row.ProductID, 0.0); position = (row.StockQuantity or 0) + int(row.OnOrder or 0)
+        if position >= max(rate * lead_days, row.ReorderPoint): continue
+        quantity = max(math.ceil(rate * (lead_days + cover_days)) - position, row.ReorderQuantity or 0, row.ReorderPoint - position, 1)
+        line = {'product_id': row.ProductID, 'product_name': row.ProductName, 'supplier_id': row.SupplierID, 'stock': row.StockQuantity,
+                'on_order': int(row.OnOrder or 0), 'velocity': round(rate, 3), 'days_of_cover': round(position / rate, 1) if rate else None, 'quantity': quantity}
+        (result.lines if row.SupplierID is not None else result.unassigned).append(line)
+    result.timings['plan_s'] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def draft_purchase_orders(result):
+    """
+    Replaces the previous run's unapproved drafts with one Draft purchase
+    order per supplier; details are bulk-inserted. The caller commits.
+    Returns [(PO_ID, SupplierID, line count)].
+    """
+    started = time.perf_counter()
+    stale = select(PurchaseOrder.PO_ID).where(PurchaseOrder.Status == DRAFT_STATUS)
+    db.session.execute(delete(PurchaseOrderDetail).where(PurchaseOrderDetail.PO_ID.in_(stale)))
+    db.session.execute(delete(PurchaseOrder).where(PurchaseOrder.Status == DRAFT_STATUS))
+    suppliers = result.by_supplier()
+    orders = {supplier_id: PurchaseOrder(SupplierID=supplier_id, Status=DRAFT_STATUS) for supplier_id in sorted(suppliers)}
+    db.session.add_all(orders.values()); db.session.flush()
+    details = [{'PO_ID': orders[supplier_id].PO_ID, 'ProductID': line['product_id'], 'Quantity': line['quantity']}
+               for supplier_id in sorted(suppliers) for line in suppliers[supplier_id]]
+    for start in range(0, len(details), DETAIL_CHUNK): db.session.execute(insert(PurchaseOrderDetail), details[start:start + DETAIL_CHUNK])
+    result.timings['draft_s'] = round(time.perf_counter() - started, 3)
+    return [(orders[supplier_id].PO_ID, supplier_id, len(suppliers[supplier_id])) for supplier_id in sorted(suppliers)]
+
+
+# --- CLI: flask replenish run [--dry-run] (nightly from cron) ---
+replenish_cli = AppGroup('replenish', help='Draft purchase orders from sales velocity.')
+
+@replenish_cli.command('run')
+@click.option('--dry-run', is_flag=True, help='Print the plan without drafting purchase orders.')
+@click.option('--today', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='Plan as of this date (default today).')
+def run_command(dry_run, today):
+    """Compute sales velocity and draft one purchase order per supplier."""
+    result = plan(today.date() if today else None)
+    for line in result.lines if dry_run else ():
+        click.echo(f"supplier {line['supplier_id']}: #{line['product_id']} {line['product_name']} x{line['quantity']} (stock {line['stock']}, on order {line['on_order']}, {line['velocity']}/day)")
+    for line in result.unassigned: click.echo(f"no supplier: #{line['product_id']} {line['product_name']} needs {line['quantity']}")
+    if not dry_run:
+        orders = draft_purchase_orders(result); db.session.commit()
+        click.echo(f"Drafted {len(orders)} purchase orders")
+    click.echo(f"{result.products} products, {len(result.lines)} to order, {len(result.unassigned)} without a supplier; " + ', '.join(f"{k} {v}" for k, v in result.timings.items()))
@@ -0,0 +1,147 @@
+# app/response_cache.py
+import time
+import hashlib
+import threading
+from functools import wraps
+from flask import request, Response
+from sqlalchemy import event
+
+# Which cache tags a committed write to each table invalidates
+TABLE_TAGS = {
+    'Sales': 'sales', 'SaleDetails': 'sales', 'DailySales': 'sales', 'DailyProductSales': 'sales', 'DailyCategorySales': 'sales',
+    'Products': 'catalog', 'Categories': 'catalog', 'Customers': 'catalog',
+}
+# Noted only when rows are inserted or deleted, for entries that just count rows (a sale's stock UPDATE leaves them be)
+ROW_COUNT_TAGS = {'Products': 'catalog_rows', 'Categories': 'catalog_rows', 'Customers': 'catalog_rows'}
+
+
+class ResponseCache:
+    """
+    Short-lived cache for the admin dashboard's stats and chart payloads.
+
+    Entries expire after a per-name TTL (DASHBOARD_CACHE_TTL, overridable per
+    name in DASHBOARD_CACHE_TTLS; 0 disables caching). Concurrent misses on
+    the same key are coalesced: one request computes, the others wait for its
+    result. Commits that touch a table in TABLE_TAGS drop every entry carrying
+    that tag, so a sale shows up on the next refresh rather than after the
+    TTL. The cache is per process; with several workers the TTL bounds how
+    stale another worker's copy can be.
+    """
+
+    def __init__(self, default_ttl=30, wait_timeout=30):
+        self.default_ttl = default_ttl
+        self.ttls = {}
+        self.wait_timeout = wait_timeout
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = {}      # key -> (expires_at, tags, value)
+        self._inflight = {}     # key -> threading.Event set when the computing request finishes
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def init_app(self, app, session):
+        self.default_ttl = app.config.get('DASHBOARD_CACHE_TTL', self.default_ttl)
+        self.ttls = dict(app.config.get('DASHBOARD_CACHE_TTLS', {}))
+        if self._listening: return
+        self._listening = True
+        event.listen(session, 'after_flush', self._track_flush)
+        event.listen(session, 'do_orm_execute', self._track_execute)
+        event.listen(session, 'after_commit', self._invalidate_committed)
+        event.listen(session, 'after_soft_rollback', lambda session, previous: session.info.pop('response_cache_tags', None))
+
+    def ttl(self, name):
+        return self.ttls.get(name, self.default_ttl)
+
+    def get_or_compute(self, name, key, compute, tags=()):
+        """Returns the cached value for (name, key), computing it at most once across concurrent callers."""
+        ttl = self.ttl(name); key = (name, key)
+        if ttl <= 0: return compute()
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and entry[0] > time.monotonic():
+                    self.hits += 1
+                    return entry[2]
+                pending = self._inflight.get(key)
+                if pending is None:
+                    pending = self._inflight[key] = threading.Event()
+                    generation = self._generation; self.misses += 1
+                    break
+                self.coalesced += 1
+            # Someone else is computing this key; take their result (or the lead if they failed)
+            pending.wait(self.wait_timeout)
+        try:
+            value = compute()
+            with self._lock:
+                if generation == self._generation: self._entries[key] = (time.monotonic() + ttl, frozenset(tags), value)
+            return value
+        finally:
+            with self._lock: self._inflight.pop(key, None)
+            pending.set()
+
+    def invalidate(self, *tags):
+        tags = set(tags)
+        with self._lock:
+            self._generation += 1
+            for key in [k for k, entry in self._entries.items() if entry[1] & tags]: del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1; self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self._entries), 'default_ttl': self.default_ttl, 'ttls': self.ttls, 'hits': self.hits, 'misses': self.misses,
+                    'coalesced': self.coalesced, 'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0}
+
+    # --- session events: remember what a transaction wrote, invalidate once it commits ---
+    @staticmethod
+    def _note(session, table_name, rows_changed=False):
+        tags = {TABLE_TAGS.get(table_name), ROW_COUNT_TAGS.get(table_name) if rows_changed else None} - {None}
+        if tags: session.info.setdefault('response_cache_tags', set()).update(tags)
+
+    def _track_flush(self, session, flush_context):
+        for obj in session.dirty: self._note(session, getattr(obj, '__tablename__', None))
+        for obj in list(session.new) + list(session.deleted): self._note(session, getattr(obj, '__tablename__', None), rows_changed=True)
+
+    def _track_execute(self, state):
+        if (state.is_insert or state.is_update or state.is_delete) and state.bind_mapper is not None:
+            self._note(state.session, state.bind_mapper.persist_selectable.name, rows_changed=state.is_insert or state.is_delete)
+
+    def _invalidate_committed(self, session):
+        tags = session.info.pop('response_cache_tags', None)
+        if tags: self.invalidate(*tags)
+
+
+response_cache = ResponseCache()
+
+
+class _Uncacheable(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def cached_json(name, tags=()):
+    """
+    Caches a JSON view's successful response body per query string and serves
+    it with an ETag, answering If-None-Match revalidations with 304.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            def compute():
+                response = view(*args, **kwargs)
+                if not isinstance(response, Response) or response.status_code != 200: raise _Uncacheable(response)
+                return response.get_data(), response.mimetype
+            key = (tuple(sorted(kwargs.items())), tuple(sorted(request.args.items(multi=True))))
+            try: body, mimetype = response_cache.get_or_compute(name, key, compute, tags)
+            except _Uncacheable as e: return e.response
+            response = Response(body, mimetype=mimetype)
+            response.set_etag(hashlib.md5(body).hexdigest())
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response.make_conditional(request)
+        return wrapped
+    return decorator
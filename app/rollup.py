@@ -0,0 +1,121 @@
+# app/rollup.py
+import datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select, insert, delete, func
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from .models import db, Sale, SaleDetail, Product, Category, DailySales, DailyProductSales, DailyCategorySales
+
+ROLLUP_MODELS = (DailySales, DailyProductSales, DailyCategorySales)
+
+
+def _accumulate(model, keys, rows):
+    """Adds each row's counters onto the matching rollup row, inserting it if it's the first."""
+    if not rows: return
+    counters = [column for column in rows[0] if column not in keys]
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('mysql', 'mariadb'):
+        stmt = mysql.insert(model).values(rows)
+        stmt = stmt.on_duplicate_key_update({c: getattr(model, c) + stmt.inserted[c] for c in counters})
+    elif dialect in ('sqlite', 'postgresql'):
+        stmt = (sqlite if dialect == 'sqlite' else postgresql).insert(model).values(rows)
+        stmt = stmt.on_conflict_do_update(index_elements=keys, set_={c: getattr(model, c) + stmt.excluded[c] for c in counters})
+    else:
+        for row in rows:
+            existing = db.session.get(model, tuple(row[k] for k in keys))
+            if existing is None: db.session.add(model(**row))
+            else:
+                for c in counters: setattr(existing, c, getattr(existing, c) + row[c])
+        return
+    db.session.execute(stmt)
+
+
+def record_sale(sale_day, total_amount, lines):
+    """
+    Folds one sale into the rollups inside the caller's transaction, so the
+    totals commit (or roll back) together with the sale itself.
+
+    `lines` is [(product_id, category_id, quantity, line_total)] with one
+    entry per product. Rows are touched in a fixed order (products, then
+    categories, then the single per-day row) so concurrent checkouts queue
+    on the hot day row last and never deadlock on each other.
+    """
+    products, categories = [], {}
+    for product_id, category_id, quantity, line_total in sorted(lines, key=lambda line: line[0]):
+        products.append({'SaleDay': sale_day, 'ProductID': product_id, 'Revenue': line_total, 'Quantity': quantity, 'TransactionCount': 1})
+        if category_id is None: continue
+        category = categories.setdefault(category_id, {'SaleDay': sale_day, 'CategoryID': category_id, 'Revenue': 0, 'Quantity': 0, 'TransactionCount': 1})
+        category['Revenue'] += line_total; category['Quantity'] += quantity
+    _accumulate(DailyProductSales, ['SaleDay', 'ProductID'], products)
+    _accumulate(DailyCategorySales, ['SaleDay', 'CategoryID'], [categories[c] for c in sorted(categories)])
+    _accumulate(DailySales, ['SaleDay'], [{'SaleDay': sale_day, 'Revenue': total_amount, 'TransactionCount': 1}])
+
+
+def rebuild(since=None):
+    """
+    Recomputes the rollups from Sales/SaleDetails for every day from `since`
+    (a date; None = all history) with one DELETE and one INSERT ... SELECT per
+    table. Categories are taken from the products' current CategoryID. The
+    caller commits. Returns the number of rows written per table.
+    """
+    # Typed so SQLite's DATE() text comes back as a date, as MySQL's does
+    day = func.date(Sale.SaleDate, type_=db.Date)
+    sources = {
+        DailySales: select(day, func.coalesce(func.sum(Sale.TotalAmount), 0), func.count(Sale.SaleID)).group_by(day),
+        DailyProductSales: select(day, SaleDetail.ProductID, func.sum(SaleDetail.TotalPrice), func.sum(SaleDetail.Quantity), func.count(SaleDetail.SaleID.distinct()))
+            .join(Sale, SaleDetail.SaleID == Sale.SaleID).group_by(day, SaleDetail.ProductID),
+        DailyCategorySales: select(day, Product.CategoryID, func.sum(SaleDetail.TotalPrice), func.sum(SaleDetail.Quantity), func.count(SaleDetail.SaleID.distinct()))
+            .join(Sale, SaleDetail.SaleID == Sale.SaleID).join(Product, SaleDetail.ProductID == Product.ProductID)
+            .where(Product.CategoryID.isnot(None)).group_by(day, Product.CategoryID),
+    }
+    written = {}
+    for model, source in sources.items():
+        stale = delete(model)
+        if since is not None:
+            stale = stale.where(model.SaleDay >= since)
+            source = source.where(Sale.SaleDate >= datetime.datetime.combine(since, datetime.time.min))
+        db.session.execute(stale)
+        columns = [c.name for c in model.__table__.columns]
+        result = db.session.execute(insert(model).from_select(columns, source))
+        written[model.__tablename__] = result.rowcount
+    return written
+
+
+def clear():
+    for model in ROLLUP_MODELS: db.session.execute(delete(model))
+
+
+# --- DASHBOARD READS ---
+def daily_revenue(start, end):
+    """{date: revenue} for start..end inclusive, with zero-sale days filled in."""
+    rows = db.session.execute(select(DailySales.SaleDay, DailySales.Revenue).where(DailySales.SaleDay.between(start, end))).all()
+    revenue = {start + datetime.timedelta(days=i): 0.0 for i in range((end - start).days + 1)}
+    for sale_day, amount in rows: revenue[sale_day] = float(amount or 0)
+    return revenue
+
+
+def revenue_by_category(since=None):
+    revenue = func.sum(DailyCategorySales.Revenue)
+    query = select(Category.CategoryName, revenue).join(Category, DailyCategorySales.CategoryID == Category.CategoryID)
+    if since is not None: query = query.where(DailyCategorySales.SaleDay >= since)
+    return db.session.execute(query.group_by(Category.CategoryName).order_by(revenue.desc())).all()
+
+
+def best_sellers(limit=5, since=None):
+    quantity = func.sum(DailyProductSales.Quantity)
+    top = select(DailyProductSales.ProductID, quantity.label('Quantity')).group_by(DailyProductSales.ProductID)
+    if since is not None: top = top.where(DailyProductSales.SaleDay >= since)
+    top = top.order_by(quantity.desc()).limit(limit).subquery()
+    return db.session.execute(select(Product.ProductName, top.c.Quantity).join(top, Product.ProductID == top.c.ProductID).order_by(top.c.Quantity.desc())).all()
+
+
+# --- CLI: flask rollup rebuild [--since YYYY-MM-DD] ---
+rollup_cli = AppGroup('rollup', help='Maintain the daily sales rollup tables.')
+
+@rollup_cli.command('rebuild')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='Only rebuild days on or after this date.')
+def rebuild_command(since):
+    """Backfill or rebuild the rollups from the raw sales tables."""
+    written = rebuild(since.date() if since else None)
+    db.session.commit()
+    for table, rows in written.items(): click.echo(f"{table}: {rows} rows")
@@ -1,162 +1,65 @@
 # app/routes.py
 import json
+import hmac
+import logging
 from functools import wraps
 from flask import (Blueprint, render_template, request, redirect,
-                   url_for, flash, session, jsonify, Response, current_app)
-from .models import db, Product, Category, Customer, Sale, SaleDetail, User, Supplier, InventoryLog, PurchaseOrder, PurchaseOrderDetail
-from sqlalchemy import func
+                   url_for, flash, session, jsonify, Response, current_app, stream_with_context)
+from .models import db, Product, Category, Customer, Sale, SaleDetail, User, Supplier, InventoryLog, PurchaseOrder, PurchaseOrderDetail, StockSnapshot
+from .checkout import process_checkout
+from .receiving import receive_purchase_order, ReceivingError
+from .bulk_update import apply_bulk_update
+from .barcode_cache import barcode_cache
+from .search import search_index
+from .response_cache import response_cache, cached_json
+from .low_stock import low_stock, alert_clients
+from . import scanner_bridge, rollup, exports, queries, catalog_import, ledger, replenishment
+from .queries import statement_budget
+from .pool_metrics import pool_stats
+from .instrumentation import instrumentation
+from .scanner_bridge import websocket_clients, WebSocketClient
+from .bridge_logging import log_event
+from sqlalchemy import update
 import datetime
 from datetime import date, timedelta
-import io
-import csv
-import socket
-import threading
-import time
-import ipaddress
 from flask_sock import Sock
 from app import sock
 
 bp = Blueprint('main', __name__)
 
-# --- Configuration & Globals ---
-TCP_HOST_PORT = 12345
-BROADCAST_PORT = 12346
-DISCOVERY_MESSAGE = b"barcode_server_discovery_request"
-websocket_clients = set()
-tcp_server_thread = None
-broadcast_thread = None
-stop_threads = threading.Event()
-
-# --- Network Utilities ---
-def get_local_ip():
-    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    try:
-        s.connect(('10.255.255.255', 1))
-        IP = s.getsockname()[0]
-    except Exception:
-        IP = '127.0.0.1'
-    finally:
-        s.close()
-    return IP
-
-def get_broadcast_address(ip):
-    try:
-        network = ipaddress.IPv4Interface(f"{ip}/24").network
-        return str(network.broadcast_address)
-    except Exception:
-        print("[Warning] Could not calculate broadcast address, using '255.255.255.255'.")
-        return '255.255.255.255'
-
-# --- WebSocket Function ---
-def broadcast_barcode(barcode_data):
-    message = json.dumps({"type": "barcode", "data": barcode_data})
-    disconnected_clients = set()
-    for client in list(websocket_clients):
-        try:
-             print(f"[WebSocket] Broadcasting '{barcode_data}' to a client.")
-             client.send(message)
-        except Exception as e:
-            print(f"[WebSocket] Error sending to client {client}: {e}. Removing client.")
-            disconnected_clients.add(client)
-    for client in disconnected_clients:
-        websocket_clients.discard(client)
-
-# --- Discovery Broadcast Thread ---
-def broadcast_presence(host_ip, tcp_port, stop_event):
-    broadcast_ip = get_broadcast_address(host_ip)
-    broadcast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
-    broadcast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-    broadcast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    message = f"{DISCOVERY_MESSAGE.decode()}|{host_ip}|{tcp_port}".encode('utf-8')
-    print(f"[Discovery] Starting broadcast: '{message.decode()}' to {broadcast_ip}:{BROADCAST_PORT}")
-    while not stop_event.is_set():
-        try:
-            broadcast_socket.sendto(message, (broadcast_ip, BROADCAST_PORT))
-        except Exception as e:
-            if not stop_event.is_set():
-                print(f"[Discovery] Broadcast error: {e}")
-        stop_event.wait(timeout=3.0)
-    broadcast_socket.close()
-    print("[Discovery] Broadcast thread stopped.")
-
-# --- TCP Listener Thread ---
-def tcp_barcode_listener(host_ip, port, stop_event):
-    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    try:
-        server_socket.bind((host_ip, port))
-        server_socket.listen(1)
-        server_socket.settimeout(1.0)
-        print(f"[TCP Listener] Started on {host_ip}:{port}")
-        while not stop_event.is_set():
-            try:
-                conn, addr = server_socket.accept()
-                print(f"[TCP] Phone connected from {addr}")
-                barcode_buffer = ""
-                conn.settimeout(1.0)
-                try:
-                    while not stop_event.is_set():
-                        try:
-                            data = conn.recv(1024)
-                            if not data: break
-                            barcode_buffer += data.decode('utf-8')
-                            while '\n' in barcode_buffer:
-                                barcode_data, barcode_buffer = barcode_buffer.split('\n', 1)
-                                barcode_data = barcode_data.strip()
-                                if barcode_data:
-                                    print(f"[TCP] Received code: {barcode_data} from {addr}")
-                                    broadcast_barcode(barcode_data)
-                        except socket.timeout: continue
-                        except ConnectionResetError: print(f"[-] Phone disconnected unexpectedly from {addr}."); break
-                        except Exception as e: print(f"[TCP] Recv Error from {addr}: {e}"); break
-                finally:
-                    conn.close()
-                    print(f"[TCP] Phone connection closed from {addr}")
-            except socket.timeout: continue
-            except Exception as e:
-                if not stop_event.is_set(): print(f"[TCP Listener] Accept Error: {e}")
-                time.sleep(0.5)
-    finally:
-        server_socket.close()
-        print("[TCP Listener] Stopped.")
-
-# --- Start Background Threads ---
-def start_background_threads():
-    global tcp_server_thread, broadcast_thread
-    host_ip = get_local_ip()
-
-    if tcp_server_thread is None or not tcp_server_thread.is_alive():
-        stop_threads.clear()
-        tcp_host_ip = '0.0.0.0'
-        tcp_server_thread = threading.Thread(
-            target=tcp_barcode_listener, args=(tcp_host_ip, TCP_HOST_PORT, stop_threads), daemon=True
-        )
-        tcp_server_thread.start()
-        print(f"Attempting to start TCP listener thread on {tcp_host_ip}:{TCP_HOST_PORT}...")
-
-    if broadcast_thread is None or not broadcast_thread.is_alive():
-        if stop_threads.is_set(): stop_threads.clear()
-        broadcast_thread = threading.Thread(
-            target=broadcast_presence, args=(host_ip, TCP_HOST_PORT, stop_threads), daemon=True
-        )
-        broadcast_thread.start()
-        print(f"Attempting to start UDP broadcast thread for IP {host_ip}...")
-
 # --- WebSocket Route ---
 @sock.route('/ws/barcode')
 def barcode_ws(ws):
-    print(f"[WebSocket] Browser connected: {request.remote_addr}")
-    websocket_clients.add(ws)
+    log_event(logging.INFO, 'browser_connected', client=request.remote_addr)
+    client = websocket_clients[ws] = WebSocketClient(ws, request.remote_addr)
     try:
-        while True:
+        while not client.closed:
             message = ws.receive(timeout=60)
             if message:
-                print(f"[WebSocket] Received message: {message}")
+                log_event(logging.DEBUG, 'browser_message', client=request.remote_addr, message=message[:200])
+                try: message = json.loads(message)
+                except ValueError: continue
+                if isinstance(message, dict) and message.get('type') == 'pair':
+                    # Route only this scanner's barcodes to this POS session (None = unpaired)
+                    client.scanner_id = message.get('scanner_id') or None
+                    client.enqueue(json.dumps({"type": "paired", "scanner_id": client.scanner_id}))
+    except Exception as e:
+        log_event(logging.WARNING, 'browser_connection_error', client=request.remote_addr, error=str(e))
+    finally:
+        log_event(logging.INFO, 'browser_disconnected', client=request.remote_addr, scanner_id=client.scanner_id)
+        client.close()
+
+@sock.route('/ws/alerts')
+def alerts_ws(ws):
+    # Admin browsers; low-stock crossings are pushed here as they commit (see app/low_stock.py)
+    if session.get('role') != 'admin': ws.close(); return
+    client = alert_clients[ws] = WebSocketClient(ws, request.remote_addr, registry=alert_clients)
+    try:
+        while not client.closed: ws.receive(timeout=60)   # Nothing is expected from the browser; this just notices it leaving
     except Exception as e:
-        print(f"[WebSocket] Connection error or closed for {request.remote_addr}: {e}")
+        log_event(logging.INFO, 'alerts_connection_closed', client=request.remote_addr, error=str(e))
     finally:
-        print(f"[WebSocket] Browser disconnected: {request.remote_addr}")
-        websocket_clients.discard(ws)
+        client.close()
 
 # --- DECORATORS ---
 def login_required(f):
@@ -183,28 +86,55 @@ def role_required(role_name):
 @bp.route('/')
 @login_required
 def index():
-    # start_background_threads() # Called in run.py
+    # start_background_threads(app) # Called in run.py
     if session['role'] == 'cashier':
         return redirect(url_for('main.new_sale_route'))
-    stats = {
+    stats = response_cache.get_or_compute('index_stats', (), lambda: {
         'total_products': Product.query.count(),
         'total_categories': Category.query.count(),
-        'total_customers': Customer.query.count(),
-        'low_stock_items': Product.query.filter(Product.StockQuantity < 10).count()
-    }
+        'total_customers': Customer.query.count()
+    }, tags=('catalog_rows',))
+    stats = dict(stats, low_stock_items=low_stock.count())
     return render_template('index.html', title="Dashboard", stats=stats)
 
 # --- PRODUCT ROUTES ---
+PRODUCT_PAGE_SIZE = 50
+
+def serialize_product(p):
+    return {
+        'ProductID': p.ProductID, 'ProductName': p.ProductName, 'Description': p.Description or '',
+        'Category': {'CategoryName': p.Category.CategoryName if p.Category else 'N/A'},
+        'Price': float(p.Price), 'StockQuantity': p.StockQuantity,
+        'LastUpdated': p.LastUpdated.isoformat() if p.LastUpdated else None
+    }
+
+def product_page(args):
+    """One keyset page of the catalog ordered by (ProductName, ProductID), with optional filters."""
+    limit = min(max(args.get('limit', PRODUCT_PAGE_SIZE, type=int), 1), 200)
+    query = Product.query.options(db.joinedload(Product.Category))
+    if args.get('category_id', type=int): query = query.filter(Product.CategoryID == args.get('category_id', type=int))
+    if args.get('supplier_id', type=int): query = query.filter(Product.SupplierID == args.get('supplier_id', type=int))
+    if args.get('min_stock', type=int) is not None: query = query.filter(Product.StockQuantity >= args.get('min_stock', type=int))
+    if args.get('max_stock', type=int) is not None: query = query.filter(Product.StockQuantity <= args.get('max_stock', type=int))
+    after_name = args.get('after_name'); after_id = args.get('after_id', 0, type=int)
+    if after_name is not None:
+        query = query.filter(db.or_(Product.ProductName > after_name, db.and_(Product.ProductName == after_name, Product.ProductID > after_id)))
+    rows = query.order_by(Product.ProductName, Product.ProductID).limit(limit + 1).all()
+    page = rows[:limit]
+    next_cursor = {'after_name': page[-1].ProductName, 'after_id': page[-1].ProductID} if len(rows) > limit else None
+    return {'products': [serialize_product(p) for p in page], 'next': next_cursor}
+
 @bp.route('/products')
 @login_required
 def show_products():
-    products_query = Product.query.order_by(Product.ProductName).all()
-    products_list = [{
-        'ProductID': p.ProductID, 'ProductName': p.ProductName, 'Description': p.Description or '',
-        'Category': {'CategoryName': p.Category.CategoryName if p.Category else 'N/A'},
-        'Price': float(p.Price), 'StockQuantity': p.StockQuantity
-    } for p in products_query]
-    return render_template('products/products.html', title='Product Catalog', products=products_list)
+    categories = Category.query.order_by(Category.CategoryName).all()
+    suppliers = Supplier.query.order_by(Supplier.SupplierName).all()
+    return render_template('products/products.html', title='Product Catalog', first_page=product_page(request.args), categories=categories, suppliers=suppliers)
+
+@bp.route('/api/products')
+@login_required
+def api_list_products():
+    return jsonify(product_page(request.args))
 
 @bp.route('/products/add_form')
 @login_required
@@ -225,9 +155,14 @@ def add_product_route():
         CategoryID=request.form.get('category_id', type=int), Price=request.form.get('price', type=float),
         StockQuantity=request.form.get('stock_quantity', type=int),
         SupplierID=request.form.get('supplier_id', type=int) if request.form.get('supplier_id') else None,
+        ReorderPoint=request.form.get('reorder_point', type=int), ReorderQuantity=request.form.get('reorder_quantity', type=int),
         Barcode=request.form.get('barcode') or None
     )
-    db.session.add(new_product); db.session.commit()
+    db.session.add(new_product); db.session.flush()
+    if new_product.StockQuantity: db.session.add(InventoryLog(ProductID=new_product.ProductID, ChangeType='Initial Stock', QuantityChange=new_product.StockQuantity))
+    db.session.commit()
+    if new_product.Barcode: barcode_cache.invalidate(barcodes=[new_product.Barcode])
+    search_index.add(new_product.ProductID, new_product.ProductName, new_product.Barcode, new_product.Description)
     return jsonify({'success': True, 'message': f"Product '{product_name}' added successfully."})
 
 @bp.route('/products/edit_form/<int:product_id>')
@@ -243,16 +178,50 @@ def edit_product_form(product_id):
 @login_required
 @role_required('admin')
 def edit_product_route(product_id):
-    product = Product.query.get_or_404(product_id)
+    # Row lock: a checkout committing between this read and ours would otherwise make the logged delta wrong
+    product = Product.query.filter_by(ProductID=product_id).with_for_update().first_or_404(); old_barcode = product.Barcode
     product.Description = request.form.get('description')
     product.CategoryID = request.form.get('category_id', type=int)
     product.Price = request.form.get('price', type=float)
-    product.StockQuantity = request.form.get('stock_quantity', type=int)
+    old_stock = product.StockQuantity; product.StockQuantity = request.form.get('stock_quantity', type=int)
+    # The ledger is the record of stock, so an edited quantity goes through it like any other adjustment
+    if product.StockQuantity is not None and product.StockQuantity != old_stock:
+        db.session.add(InventoryLog(ProductID=product_id, ChangeType='Manual Adjustment', QuantityChange=product.StockQuantity - (old_stock or 0), Notes='Edited on product form'))
     product.SupplierID = request.form.get('supplier_id', type=int) if request.form.get('supplier_id') else None
+    product.ReorderPoint = request.form.get('reorder_point', type=int); product.ReorderQuantity = request.form.get('reorder_quantity', type=int)
     product.Barcode = request.form.get('barcode') or None
     db.session.commit()
+    barcode_cache.invalidate(product_ids=[product_id], barcodes=[b for b in (old_barcode, product.Barcode) if b])
+    search_index.add(product.ProductID, product.ProductName, product.Barcode, product.Description)
     return jsonify({'success': True, 'message': f"Product '{product.ProductName}' updated successfully."})
 
+@bp.route('/api/products/import', methods=['POST'])
+@login_required
+@role_required('admin')
+def api_import_products():
+    upload = request.files.get('file')
+    if not upload or not upload.filename: return jsonify({'success': False, 'message': 'Choose a CSV or JSON file to import.'}), 400
+    file_format = request.form.get('format') or catalog_import.detect_format(upload.filename)
+    report = catalog_import.import_catalog(upload.stream, file_format)
+    return jsonify({'success': True, 'message': f"Imported {report.inserted} new and {report.updated} updated products, {report.failed} rows failed.", **report.as_dict()})
+
+@bp.route('/api/products/bulk_update', methods=['POST'])
+@login_required
+@role_required('admin')
+def api_bulk_update_products():
+    # {"items": [{"product_id", "price"?, "stock_delta" | "stock"?, "last_updated"?}], "change_type"?, "notes"?}
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+    if not isinstance(items, list) or not items: return jsonify({'success': False, 'message': 'No items to update.'}), 400
+    try:
+        results = apply_bulk_update(items, data.get('change_type') or 'Stock Correction', data.get('notes')); db.session.commit()
+    except Exception as e:
+        db.session.rollback(); return jsonify({'success': False, 'message': f'Bulk update failed: {e}'}), 500
+    barcode_cache.invalidate(product_ids=[r['product_id'] for r in results if r.get('status') == 'updated'])
+    counts = {}
+    for r in results: counts[r['status']] = counts.get(r['status'], 0) + 1
+    return jsonify({'success': True, 'message': f"{counts.get('updated', 0)} of {len(items)} products updated.", 'counts': counts, 'results': results})
+
 # --- CATEGORY ROUTES ---
 @bp.route('/categories')
 @login_required
@@ -362,7 +331,8 @@ def add_supplier_route():
     name = request.form.get('supplier_name')
     if not name: return jsonify({'success': False, 'message': 'Supplier name required.'}), 400
     if Supplier.query.filter_by(SupplierName=name).first(): return jsonify({'success': False, 'message': 'Supplier name already exists.'}), 400
-    new_supp = Supplier(SupplierName=name, ContactName=request.form.get('contact_name'), PhoneNumber=request.form.get('phone_number'), Email=request.form.get('email'), Address=request.form.get('address'))
+    new_supp = Supplier(SupplierName=name, ContactName=request.form.get('contact_name'), PhoneNumber=request.form.get('phone_number'), Email=request.form.get('email'), Address=request.form.get('address'),
+                        ReorderPoint=request.form.get('reorder_point', type=int), ReorderQuantity=request.form.get('reorder_quantity', type=int))
     db.session.add(new_supp); db.session.commit()
     return jsonify({'success': True, 'message': f"Supplier '{name}' added."})
 
@@ -382,6 +352,7 @@ def edit_supplier_route(supplier_id):
     existing = Supplier.query.filter(Supplier.SupplierID != supplier_id, Supplier.SupplierName == new_name).first()
     if existing: return jsonify({'success': False, 'message': f"Supplier name '{new_name}' already exists."}), 400
     supp.SupplierName = new_name; supp.ContactName = request.form.get('contact_name'); supp.PhoneNumber = request.form.get('phone_number'); supp.Email = request.form.get('email'); supp.Address = request.form.get('address')
+    supp.ReorderPoint = request.form.get('reorder_point', type=int); supp.ReorderQuantity = request.form.get('reorder_quantity', type=int)
     db.session.commit()
     return jsonify({'success': True, 'message': 'Supplier updated.'})
 
@@ -396,44 +367,45 @@ def new_sale_route():
         if not items_sold: flash("Cart is empty.", "info"); return redirect(url_for('main.new_sale_route'))
         customer_id = int(customer_id_str) if customer_id_str and customer_id_str.isdigit() else None
         try:
-            new_sale = Sale(CustomerID=customer_id, TotalAmount=0, PaymentMethod=payment_method); db.session.add(new_sale); db.session.flush()
-            total_sale_amount = 0
-            for item in items_sold:
-                product = Product.query.get(item['product_id'])
-                if not product or product.StockQuantity < item['quantity']: raise Exception(f"Insufficient stock for {product.ProductName if product else 'Unknown'}.")
-                product.StockQuantity -= item['quantity']
-                line_total = product.Price * item['quantity']; total_sale_amount += line_total
-                db.session.add(SaleDetail(SaleID=new_sale.SaleID, ProductID=item['product_id'], Quantity=item['quantity'], UnitPrice=product.Price, TotalPrice=line_total))
-                db.session.add(InventoryLog(ProductID=item['product_id'], SaleID=new_sale.SaleID, ChangeType='Sale', QuantityChange=-item['quantity'], Notes=f"Sale ID: {new_sale.SaleID}"))
-            new_sale.TotalAmount = total_sale_amount; db.session.commit()
+            new_sale = process_checkout(items_sold, customer_id, payment_method); db.session.commit()
+            barcode_cache.invalidate(product_ids=[int(item['product_id']) for item in items_sold])
             flash(f"Sale processed! ID: {new_sale.SaleID}", "success"); return redirect(url_for('main.sale_receipt_route', sale_id=new_sale.SaleID))
         except Exception as e: db.session.rollback(); flash(f"Error processing sale: {e}", "error"); return redirect(url_for('main.new_sale_route'))
-    products = Product.query.filter(Product.StockQuantity > 0).order_by(Product.ProductName).all()
-    customers = Customer.query.order_by(Customer.LastName, Customer.FirstName).all()
-    return render_template('sales/new_sale.html', title='New Sale', products=products, customers=customers)
+    # Products and customers are picked through the typeahead APIs, so the page is the same size for any catalog
+    return render_template('sales/new_sale.html', title='New Sale')
 
 @bp.route('/sales/history')
 @login_required
+@statement_budget(1)
 def sales_history_route():
     start_date_str = request.args.get('start_date'); end_date_str = request.args.get('end_date')
-    query = Sale.query.options(db.joinedload(Sale.Customer))
+    query = queries.sales_listing()
     if start_date_str: query = query.filter(Sale.SaleDate >= datetime.datetime.strptime(start_date_str, '%Y-%m-%d').date())
     if end_date_str: query = query.filter(Sale.SaleDate < (datetime.datetime.strptime(end_date_str, '%Y-%m-%d').date() + timedelta(days=1)))
-    sales_records = query.order_by(Sale.SaleDate.desc()).all()
-    return render_template('sales/sales_history.html', title='Sales History', sales_records=sales_records)
+    sales_records, next_cursor, page_totals = queries.sales_page(query, request.args)
+    return render_template('sales/sales_history.html', title='Sales History', sales_records=sales_records, next_cursor=next_cursor, page_totals=page_totals)
 
 @bp.route('/sales/details/<int:sale_id>')
 @login_required
+@statement_budget(2)
 def sale_details_route(sale_id):
-    sale = Sale.query.get_or_404(sale_id)
+    sale = queries.sale_with_lines(sale_id)
     return render_template('sales/sale_details.html', title=f"Sale Details #{sale_id}", sale=sale, items=sale.SaleDetails)
 
 @bp.route('/inventory/low_stock')
 @login_required
 @role_required('admin')
 def low_stock_report_route():
-    items = Product.query.filter(Product.StockQuantity < 10).order_by(Product.StockQuantity).all()
-    return render_template('inventory/low_stock_report.html', title="Low Stock Report", items=items, threshold=10)
+    levels = {item['product_id']: item for item in low_stock.items()}
+    # The watcher knows which products are low; fetch just those rows for the category names
+    items = Product.query.options(db.joinedload(Product.Category)).filter(Product.ProductID.in_(levels)).order_by(Product.StockQuantity, Product.ProductID).all() if levels else []
+    return render_template('inventory/low_stock_report.html', title="Low Stock Report", items=items, levels=levels)
+
+@bp.route('/api/low_stock')
+@login_required
+@role_required('admin')
+def api_low_stock():
+    return jsonify({'items': low_stock.items(), **low_stock.stats()})
 
 @bp.route('/inventory/adjust', methods=['GET', 'POST'])
 @login_required
@@ -443,20 +415,60 @@ def inventory_adjustment_route():
         prod_id = request.form.get('product_id', type=int); qty_change = request.form.get('quantity_change', type=int); change_type = request.form.get('change_type')
         if not all([prod_id, qty_change is not None, change_type]): flash("All fields required.", "error")
         else:
-            prod = Product.query.get(prod_id)
+            # Row lock, as in edit_product_route: a checkout committing in between would otherwise be overwritten
+            prod = Product.query.filter_by(ProductID=prod_id).with_for_update().first()
             if not prod: flash("Product not found.", "error")
             else:
                 prod.StockQuantity += qty_change
                 db.session.add(InventoryLog(ProductID=prod_id, ChangeType=change_type, QuantityChange=qty_change, Notes=request.form.get('notes')))
-                db.session.commit(); flash(f"Stock for '{prod.ProductName}' updated.", "success"); return redirect(url_for('main.inventory_adjustment_route'))
+                db.session.commit(); barcode_cache.invalidate(product_ids=[prod_id])
+                flash(f"Stock for '{prod.ProductName}' updated.", "success"); return redirect(url_for('main.inventory_adjustment_route'))
     products = Product.query.order_by(Product.ProductName).all()
     return render_template('inventory/inventory_adjustment.html', products=products, title="Inventory Adjustment")
 
+def _utc_arg(name, default=None):
+    """An ISO date/datetime query argument as naive UTC (ValueError if malformed)."""
+    value = request.args.get(name)
+    if not value: return default
+    parsed = datetime.datetime.fromisoformat(value)
+    return parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None) if parsed.tzinfo else parsed
+
+@bp.route('/api/inventory/stock_at')
+@login_required
+@role_required('admin')
+def api_stock_at():
+    # ?at=2025-01-31T18:00:00 (UTC; default now) &product_id=1&product_id=2 (default all products with stock)
+    try: at = _utc_arg('at')
+    except ValueError: return jsonify({'success': False, 'message': "'at' must be an ISO date or datetime."}), 400
+    product_ids = request.args.getlist('product_id', type=int) or None
+    stock, snapshot_at = ledger.stock_at(at, product_ids)
+    if product_ids: stock = {pid: stock.get(pid, 0) for pid in product_ids}
+    return jsonify({'success': True, 'at': at.isoformat() if at else None, 'snapshot_at': snapshot_at.isoformat() if snapshot_at else None, 'stock': stock})
+
+@bp.route('/api/inventory/movement')
+@login_required
+@role_required('admin')
+def api_stock_movement():
+    # ?start=2025-01-01&end=2025-02-01 (UTC, end default now) &product_id=... : opening, closing and net change by type
+    try: start = _utc_arg('start'); end = _utc_arg('end', datetime.datetime.utcnow())
+    except ValueError: return jsonify({'success': False, 'message': "'start' and 'end' must be ISO dates or datetimes."}), 400
+    if start is None or start > end: return jsonify({'success': False, 'message': "A 'start' before 'end' is required."}), 400
+    report = ledger.movement(start, end, request.args.getlist('product_id', type=int) or None)
+    return jsonify({'success': True, 'start': start.isoformat(), 'end': end.isoformat(), 'products': report})
+
+@bp.route('/api/inventory/reconcile')
+@login_required
+@role_required('admin')
+def api_reconcile_inventory():
+    # Read-only; `flask ledger reconcile --record` appends the corrections
+    return jsonify({'success': True, **ledger.reconcile(deep=request.args.get('deep') == '1')})
+
 @bp.route('/purchase_orders')
 @login_required
 @role_required('admin')
+@statement_budget(1)
 def show_purchase_orders():
-    pos = PurchaseOrder.query.order_by(PurchaseOrder.OrderDate.desc()).all()
+    pos = queries.purchase_orders_listing().all()
     return render_template('purchase_orders/purchase_orders.html', purchase_orders=pos, title="Purchase Orders")
 
 @bp.route('/purchase_orders/new', methods=['GET', 'POST'])
@@ -479,20 +491,62 @@ def new_purchase_order_route():
 @bp.route('/purchase_orders/<int:po_id>', methods=['GET', 'POST'])
 @login_required
 @role_required('admin')
+@statement_budget(2)
 def purchase_order_details_route(po_id):
-    po = PurchaseOrder.query.get_or_404(po_id)
     if request.method == 'POST':
-        if po.Status == 'Completed': flash("Order already completed.", "error")
-        else:
-            try:
-                for detail in po.Details:
-                    detail.Product.StockQuantity += detail.Quantity
-                    db.session.add(InventoryLog(ProductID=detail.ProductID, ChangeType='Purchase Order', QuantityChange=detail.Quantity, Notes=f"PO #{po.PO_ID}"))
-                po.Status = 'Completed'; db.session.commit(); flash(f"PO #{po.PO_ID} completed. Stock updated.", "success")
-            except Exception as e: db.session.rollback(); flash(f"An error occurred: {e}", "error")
-        return redirect(url_for('main.purchase_order_details_route', po_id=po.PO_ID))
+        try:
+            # mode=partial books the per-line quantities entered; otherwise everything outstanding arrives
+            received = None
+            if request.form.get('mode') == 'partial':
+                received = {int(key[len('received_'):]): int(value or 0) for key, value in request.form.items() if key.startswith('received_')}
+            po, product_ids = receive_purchase_order(po_id, received); db.session.commit()
+            barcode_cache.invalidate(product_ids=product_ids)
+            flash(f"PO #{po_id} {'completed' if po.Status == 'Completed' else 'partially received'}. Stock updated.", "success")
+        except ReceivingError as e: db.session.rollback(); flash(str(e), "error")
+        except ValueError: db.session.rollback(); flash("Received quantities must be whole numbers.", "error")
+        except Exception as e: db.session.rollback(); flash(f"An error occurred: {e}", "error")
+        return redirect(url_for('main.purchase_order_details_route', po_id=po_id))
+    po = queries.purchase_order_with_lines(po_id)
     return render_template('purchase_orders/purchase_order_details.html', po=po, title=f"PO #{po.PO_ID} Details")
 
+@bp.route('/purchase_orders/replenish', methods=['POST'])
+@login_required
+@role_required('admin')
+def replenish_purchase_orders_route():
+    # Same run as the nightly `flask replenish run`; replaces the drafts nobody has approved yet
+    try:
+        plan = replenishment.plan(); orders = replenishment.draft_purchase_orders(plan); db.session.commit()
+        flash(f"Drafted {len(orders)} purchase orders for {len(plan.lines)} products." + (f" {len(plan.unassigned)} products need reordering but have no supplier." if plan.unassigned else ''), "success")
+    except Exception as e: db.session.rollback(); flash(f"Error drafting purchase orders: {e}", "error")
+    return redirect(url_for('main.show_purchase_orders'))
+
+@bp.route('/api/replenishment/plan')
+@login_required
+@role_required('admin')
+def api_replenishment_plan():
+    # Preview only, nothing is drafted
+    plan = replenishment.plan()
+    return jsonify({'success': True, **plan.as_dict(), 'lines': plan.lines})
+
+@bp.route('/purchase_orders/<int:po_id>/approve', methods=['POST'])
+@login_required
+@role_required('admin')
+def approve_purchase_order_route(po_id):
+    # Conditional UPDATE: only a draft moves to Pending, so a double submit or a rerun replacing it is a no-op
+    approved = db.session.execute(update(PurchaseOrder).where(PurchaseOrder.PO_ID == po_id, PurchaseOrder.Status == replenishment.DRAFT_STATUS)
+                                  .values(Status='Pending', OrderDate=datetime.datetime.utcnow())).rowcount; db.session.commit()
+    if approved: flash(f"PO #{po_id} approved.", "success"); return redirect(url_for('main.purchase_order_details_route', po_id=po_id))
+    flash(f"PO #{po_id} is not a draft.", "error"); return redirect(url_for('main.show_purchase_orders'))
+
+@bp.route('/purchase_orders/<int:po_id>/discard', methods=['POST'])
+@login_required
+@role_required('admin')
+def discard_purchase_order_route(po_id):
+    po = db.session.get(PurchaseOrder, po_id)
+    if po is None or po.Status != replenishment.DRAFT_STATUS: flash(f"PO #{po_id} is not a draft.", "error")
+    else: db.session.delete(po); db.session.commit(); flash(f"Draft PO #{po_id} discarded.", "success")
+    return redirect(url_for('main.show_purchase_orders'))
+
 # --- AUTHENTICATION ROUTES ---
 @bp.route('/login', methods=['GET', 'POST'])
 def login_route():
@@ -539,23 +593,47 @@ def change_password_route():
 @login_required
 def api_search_products():
     query = request.args.get('q', '')
-    products_query = Product.query.filter(Product.ProductName.like(f"%{query}%")).order_by(Product.ProductName).limit(20).all()
-    return jsonify([{
-        'ProductID': p.ProductID, 'ProductName': p.ProductName, 'Description': p.Description or '',
-        'Category': {'CategoryName': p.Category.CategoryName if p.Category else 'N/A'},
-        'Price': float(p.Price), 'StockQuantity': p.StockQuantity
-    } for p in products_query])
+    in_stock = request.args.get('in_stock', type=int)
+    product_ids = search_index.search(query, limit=40 if in_stock else 20)
+    # The index only ranks; price, stock and category come fresh from one PK lookup
+    products_query = Product.query.options(db.joinedload(Product.Category)).filter(Product.ProductID.in_(product_ids))
+    if in_stock: products_query = products_query.filter(Product.StockQuantity > 0)
+    products = {p.ProductID: p for p in products_query} if product_ids else {}
+    product_ids = [pid for pid in product_ids if pid in products][:20]
+    return jsonify([serialize_product(p) for p in (products.get(pid) for pid in product_ids) if p])
+
+@bp.route('/api/customers/search')
+@login_required
+def api_search_customers():
+    # Prefix matches only, so MySQL can answer from the name/email/phone indexes
+    terms = request.args.get('q', '').split()
+    if not terms: return jsonify([])
+    if len(terms) == 1:
+        condition = db.or_(*(column.startswith(terms[0], autoescape=True) for column in (Customer.FirstName, Customer.LastName, Customer.Email, Customer.PhoneNumber)))
+    else:
+        condition = db.and_(Customer.FirstName.startswith(terms[0], autoescape=True), Customer.LastName.startswith(' '.join(terms[1:]), autoescape=True))
+    customers = Customer.query.filter(condition).order_by(Customer.LastName, Customer.FirstName).limit(20).all()
+    return jsonify([{'CustomerID': c.CustomerID, 'Name': f"{c.FirstName} {c.LastName or ''}".strip(),
+                     'Email': c.Email or '', 'PhoneNumber': c.PhoneNumber or ''} for c in customers])
 
 @bp.route('/api/products/<int:product_id>', methods=['DELETE'])
 @login_required
 @role_required('admin')
 def api_delete_product(product_id):
     product = Product.query.get_or_404(product_id)
-    try: db.session.delete(product); db.session.commit(); return jsonify({'success': True, 'message': f"Product '{product.ProductName}' deleted."})
+    # The ledger is append-only: once stock has moved past its opening balance the product keeps its history
+    if InventoryLog.query.filter(InventoryLog.ProductID == product_id, InventoryLog.ChangeType != 'Initial Stock').first():
+        return jsonify({'success': False, 'message': f"Cannot delete '{product.ProductName}': it has stock history (sales, deliveries or adjustments)."}), 400
+    try:
+        # Nothing but an opening balance: it and the snapshots carrying it go with the product
+        InventoryLog.query.filter_by(ProductID=product_id).delete(synchronize_session=False)
+        StockSnapshot.query.filter_by(ProductID=product_id).delete(synchronize_session=False)
+        db.session.delete(product); db.session.commit(); barcode_cache.invalidate(product_ids=[product_id]); search_index.remove(product_id)
+        return jsonify({'success': True, 'message': f"Product '{product.ProductName}' deleted."})
     except Exception as e:
-        db.session.rollback(); msg = 'An unexpected error occurred.'
-        if 'foreign key constraint' in str(e).lower(): msg = 'Cannot delete: product is part of an existing sale.'
-        return jsonify({'success': False, 'message': msg}), 500 if 'constraint' not in msg else 400
+        db.session.rollback()
+        if 'foreign key constraint' in str(e).lower(): return jsonify({'success': False, 'message': 'Cannot delete: product is on an existing sale or purchase order.'}), 400
+        return jsonify({'success': False, 'message': 'An unexpected error occurred.'}), 500
 
 @bp.route('/api/categories/<int:category_id>', methods=['DELETE'])
 @login_required
@@ -585,45 +663,30 @@ def api_delete_supplier(supplier_id):
 
 @bp.route('/api/sales/last_7_days')
 @login_required
+@cached_json('sales_last_7_days', tags=('sales',))
 def sales_last_7_days_api():
     try:
-        start = date.today() - timedelta(days=6)
-        data = db.session.query(
-            func.date(Sale.SaleDate).label('d'),
-            func.sum(Sale.TotalAmount).label('t')
-        ).filter(Sale.SaleDate >= start)\
-         .group_by(func.date(Sale.SaleDate))\
-         .order_by(func.date(Sale.SaleDate))\
-         .all()
-        sales = { (start + timedelta(days=i)).strftime('%Y-%m-%d'): 0 for i in range(7) }
-        for row in data:
-            if isinstance(row[0], datetime.date):
-                day_str = row[0].strftime('%Y-%m-%d')
-                if day_str in sales:
-                    sales[day_str] = float(row[1] or 0)
-            else:
-                current_app.logger.warning(f"Unexpected type for date aggregation: {type(row[0])}, value: {row[0]}")
-        return jsonify({'labels': list(sales.keys()), 'data': list(sales.values())})
+        end = date.today(); start = end - timedelta(days=6)
+        sales = rollup.daily_revenue(start, end)
+        return jsonify({'labels': [d.strftime('%Y-%m-%d') for d in sales], 'data': list(sales.values())})
     except Exception as e:
         current_app.logger.error(f"Error in sales_last_7_days_api: {e}", exc_info=True)
         return jsonify({"error": "Internal server error fetching sales data"}), 500
 
+def rollup_since(args):
+    """Optional ?days=N window for the all-history dashboard charts (None = all history)."""
+    days = args.get('days', type=int)
+    return date.today() - timedelta(days=days - 1) if days and days > 0 else None
+
 @bp.route('/api/sales/by_category')
 @login_required
 @role_required('admin')
+@cached_json('sales_by_category', tags=('sales', 'catalog'))
 def sales_by_category_api():
     try:
-        data = db.session.query(
-            Category.CategoryName,
-            func.sum(SaleDetail.TotalPrice).label('r')
-        ).select_from(SaleDetail)\
-         .join(Product, SaleDetail.ProductID == Product.ProductID)\
-         .join(Category, Product.CategoryID == Category.CategoryID)\
-         .group_by(Category.CategoryName)\
-         .order_by(func.sum(SaleDetail.TotalPrice).desc())\
-         .all()
+        data = rollup.revenue_by_category(since=rollup_since(request.args))
         labels = [r.CategoryName for r in data]
-        values = [float(r.r or 0) for r in data]
+        values = [float(r[1] or 0) for r in data]
         return jsonify({'labels': labels, 'data': values})
     except Exception as e:
         current_app.logger.error(f"Error in sales_by_category_api: {e}", exc_info=True)
@@ -633,18 +696,11 @@ def sales_by_category_api():
 @bp.route('/api/products/best_sellers')
 @login_required
 @role_required('admin')
+@cached_json('best_sellers', tags=('sales', 'catalog'))
 def best_sellers_api():
     try:
-        sellers = db.session.query(
-            Product.ProductName,
-            func.sum(SaleDetail.Quantity).label('s')
-        ).select_from(SaleDetail)\
-         .join(Product, SaleDetail.ProductID == Product.ProductID)\
-         .group_by(Product.ProductName)\
-         .order_by(func.sum(SaleDetail.Quantity).desc())\
-         .limit(5)\
-         .all()
-        return jsonify({'labels': [r.ProductName for r in sellers], 'data': [int(r.s or 0) for r in sellers]})
+        sellers = rollup.best_sellers(limit=5, since=rollup_since(request.args))
+        return jsonify({'labels': [r.ProductName for r in sellers], 'data': [int(r.Quantity or 0) for r in sellers]})
     except Exception as e:
         current_app.logger.error(f"Error in best_sellers_api: {e}", exc_info=True)
         return jsonify({"error": "Internal server error fetching best sellers"}), 500
@@ -653,49 +709,94 @@ def best_sellers_api():
 @bp.route('/customers/<int:customer_id>/history')
 @login_required
 @role_required('admin')
+@statement_budget(2)
 def customer_history_route(customer_id):
     customer = Customer.query.get_or_404(customer_id)
-    sales = Sale.query.filter_by(CustomerID=customer_id).order_by(Sale.SaleDate.desc()).all()
-    return render_template('customers/customer_history.html', title='Purchase History', customer=customer, sales=sales)
+    sales, next_cursor, page_totals = queries.sales_page(queries.customer_sales(customer_id), request.args)
+    return render_template('customers/customer_history.html', title='Purchase History', customer=customer, sales=sales, next_cursor=next_cursor, page_totals=page_totals)
 
 @bp.route('/sales/receipt/<int:sale_id>')
 @login_required
+@statement_budget(2)
 def sale_receipt_route(sale_id):
-    sale = Sale.query.get_or_404(sale_id)
+    sale = queries.sale_with_lines(sale_id)
     return render_template('sales/receipt.html', title=f"Receipt #{sale_id}", sale=sale)
 
 @bp.route('/api/products/by_barcode/<string:barcode>')
 @login_required
 def api_product_by_barcode(barcode):
-    prod = Product.query.filter_by(Barcode=barcode).first()
-    if prod: return jsonify({'ProductID': prod.ProductID, 'ProductName': prod.ProductName, 'Price': float(prod.Price), 'StockQuantity': prod.StockQuantity})
+    payload = barcode_cache.get(barcode)
+    if payload: return jsonify(payload)
     return jsonify({'error': 'Product not found'}), 404
 
+@bp.route('/api/scanners')
+@login_required
+def api_connected_scanners():
+    server = scanner_bridge.scanner_server
+    return jsonify({'scanners': server.scanner_ids() if server else []})
+
+@bp.route('/api/websocket/stats')
+@login_required
+@role_required('admin')
+def api_websocket_stats():
+    return jsonify(scanner_bridge.websocket_stats())
+
+@bp.route('/api/barcode_cache/stats')
+@login_required
+@role_required('admin')
+def api_barcode_cache_stats():
+    return jsonify(barcode_cache.stats())
+
+@bp.route('/api/dashboard_cache/stats')
+@login_required
+@role_required('admin')
+def api_dashboard_cache_stats():
+    return jsonify(response_cache.stats())
+
+@bp.route('/api/db_pool/stats')
+@login_required
+@role_required('admin')
+def api_db_pool_stats():
+    return jsonify(pool_stats(db.engine))
+
+@bp.route('/api/slow_queries')
+@login_required
+@role_required('admin')
+def api_slow_queries():
+    return jsonify({'threshold_ms': current_app.config['SLOW_QUERY_MS'], 'queries': list(reversed(instrumentation.slow_queries))})
+
+@bp.route('/metrics')
+def metrics_route():
+    # Prometheus scrapes with the METRICS_TOKEN bearer token; a logged-in admin can look too
+    token = current_app.config.get('METRICS_TOKEN')
+    if session.get('role') != 'admin' and not (token and hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}")):
+        return Response("Forbidden\n", status=403, mimetype='text/plain')
+    return Response(instrumentation.render(), mimetype='text/plain; version=0.0.4')
+
+def csv_download(filename, header, rows):
+    """Streams CSV rows to the client as they're read (chunked), gzip-compressed when ?gzip=1."""
+    chunks = exports.csv_chunks(header, rows)
+    if request.args.get('gzip') == '1':
+        chunks = exports.gzip_chunks(chunks); filename += '.gz'; mimetype = 'application/gzip'
+    else: mimetype = 'text/csv'
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers={"Content-Disposition": f"attachment;filename={filename}"})
+
 @bp.route('/export/low_stock_csv')
 @login_required
 @role_required('admin')
 def export_low_stock_csv():
-    items = Product.query.filter(Product.StockQuantity < 10).order_by(Product.StockQuantity).all()
-    output = io.StringIO(); writer = csv.writer(output)
-    writer.writerow(['ID', 'Name', 'Stock', 'Price'])
-    for i in items: writer.writerow([i.ProductID, i.ProductName, i.StockQuantity, i.Price])
-    output.seek(0)
-    return Response(output, mimetype="text/csv", headers={"Content-Disposition":"attachment;filename=low_stock.csv"})
+    return csv_download('low_stock.csv', ['ID', 'Name', 'Stock', 'Price', 'Reorder Point', 'Reorder Quantity'], exports.low_stock_rows(low_stock.items()))
 
 @bp.route('/export/sales_csv')
 @login_required
 @role_required('admin')
 def export_sales_csv():
-    start = request.args.get('start_date'); end = request.args.get('end_date')
-    query = Sale.query.options(db.joinedload(Sale.Customer))
-    if start: query = query.filter(Sale.SaleDate >= datetime.datetime.strptime(start, '%Y-%m-%d').date())
-    if end: query = query.filter(Sale.SaleDate < (datetime.datetime.strptime(end, '%Y-%m-%d').date() + timedelta(days=1)))
-    sales = query.order_by(Sale.SaleDate.desc()).all()
-    output = io.StringIO(); writer = csv.writer(output)
-    writer.writerow(['ID', 'Date', 'Customer', 'Total', 'Payment Method'])
-    for s in sales: writer.writerow([s.SaleID, s.SaleDate.strftime('%Y-%m-%d %H:%M:%S'), f"{s.Customer.FirstName} {s.Customer.LastName or ''}" if s.Customer else "Guest", s.TotalAmount, s.PaymentMethod])
-    output.seek(0)
-    return Response(output, mimetype="text/csv", headers={"Content-Disposition": "attachment;filename=sales.csv"})
+    start = request.args.get('start_date'); end = request.args.get('end_date'); filters = []
+    if start: filters.append(Sale.SaleDate >= datetime.datetime.strptime(start, '%Y-%m-%d').date())
+    if end: filters.append(Sale.SaleDate < (datetime.datetime.strptime(end, '%Y-%m-%d').date() + timedelta(days=1)))
+    line_items = request.args.get('detail') == 'items'
+    return csv_download('sales_items.csv' if line_items else 'sales.csv', exports.LINE_ITEM_COLUMNS if line_items else exports.SALE_COLUMNS,
+                        exports.sales_rows(filters, line_items=line_items))
 
 # --- ADMIN ROUTES ---
 @bp.route('/admin/wipe_db_form')
@@ -711,7 +812,7 @@ def wipe_database():
     pwd = request.form.get('password'); user = User.query.get(session['user_id'])
     if not user or not user.check_password(pwd): return jsonify({'success': False, 'message': 'Incorrect password.'}), 403
     try:
-        db.session.query(SaleDetail).delete(); db.session.query(InventoryLog).delete(); db.session.query(PurchaseOrderDetail).delete()
+        db.session.query(SaleDetail).delete(); db.session.query(InventoryLog).delete(); db.session.query(PurchaseOrderDetail).delete(); db.session.query(StockSnapshot).delete(); rollup.clear()
         db.session.flush()
         db.session.query(Sale).delete(); db.session.query(PurchaseOrder).delete()
         db.session.flush()
@@ -720,7 +821,7 @@ def wipe_database():
         db.session.query(Category).delete(); db.session.query(Supplier).delete(); db.session.query(Customer).delete()
         db.session.flush()
         db.session.query(User).filter(User.Role != 'admin').delete()
-        db.session.commit()
+        db.session.commit(); barcode_cache.clear(); search_index.load([]); low_stock.clear()
         return jsonify({'success': True, 'message': 'Database wiped. Admin users preserved.'})
     except Exception as e:
         db.session.rollback(); return jsonify({'success': False, 'message': f'Error: {e}'}), 500
\ No newline at end of file
@@ -0,0 +1,367 @@
+# app/scanner_bridge.py
+import json
+import logging
+import queue
+import selectors
+import socket
+import threading
+import ipaddress
+import time
+from collections import deque
+from .barcode_cache import barcode_cache
+from .bridge_logging import log_event
+
+# --- Configuration & Globals ---
+TCP_HOST_PORT = 12345
+BROADCAST_PORT = 12346
+DISCOVERY_MESSAGE = b"barcode_server_discovery_request"
+SCANNER_HELLO = "SCANNER "    # Optional first line a scanner may send to name itself: "SCANNER <id>"
+MAX_LINE_BYTES = 4096         # A scanner that sends this much without a newline is misbehaving
+SCAN_QUEUE_SIZE = 1024        # Scans waiting for lookup; when full, scanner sockets stop being read
+CLIENT_QUEUE_SIZE = 64        # Messages waiting to be sent to one browser; a client that falls this far behind is dropped
+websocket_clients = {}        # ws -> WebSocketClient
+scanner_server = None
+broadcast_thread = None
+stop_threads = threading.Event()
+
+# --- Network Utilities ---
+def get_local_ip():
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect(('10.255.255.255', 1))
+        IP = s.getsockname()[0]
+    except Exception:
+        IP = '127.0.0.1'
+    finally:
+        s.close()
+    return IP
+
+def get_broadcast_address(ip):
+    try:
+        network = ipaddress.IPv4Interface(f"{ip}/24").network
+        return str(network.broadcast_address)
+    except Exception:
+        log_event(logging.WARNING, 'broadcast_address_fallback', ip=ip, broadcast='255.255.255.255')
+        return '255.255.255.255'
+
+# --- WebSocket Function ---
+def resolve_barcode(app, barcode_data):
+    # Resolve once on the server so browsers don't each make an HTTP round-trip per scan
+    with app.app_context():
+        try: payload = barcode_cache.get(barcode_data)
+        except Exception as e:
+            log_event(logging.WARNING, 'lookup_failed', barcode=barcode_data, error=str(e))
+            return {"type": "barcode", "data": barcode_data}
+    if payload: return {"type": "product", "barcode": barcode_data, "data": payload}
+    return {"type": "barcode_not_found", "data": barcode_data}
+
+class DeliveryStats:
+    """
+    Counters and windows of recent latencies across all browsers: enqueue -> sent
+    per message, and TCP receive -> WebSocket sent per scan.
+    """
+
+    def __init__(self, window=2048):
+        self.latencies_ms = deque(maxlen=window)
+        self.scan_latencies_ms = deque(maxlen=window)
+        self.delivered = 0
+        self.failed = 0
+        self.slow_clients_dropped = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency_ms, scan_latency_ms=None):
+        with self._lock:
+            self.latencies_ms.append(latency_ms); self.delivered += 1
+            if scan_latency_ms is not None: self.scan_latencies_ms.append(scan_latency_ms)
+
+    def count(self, counter):
+        with self._lock: setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self.latencies_ms); scan_latencies = sorted(self.scan_latencies_ms)
+            counts = (self.delivered, self.failed, self.slow_clients_dropped)
+        pct = lambda values, p: round(values[min(len(values) - 1, int(len(values) * p / 100))], 3) if values else None
+        return {'delivered': counts[0], 'failed': counts[1], 'slow_clients_dropped': counts[2],
+                'latency_ms': {'p50': pct(latencies, 50), 'p95': pct(latencies, 95), 'p99': pct(latencies, 99)},
+                'scan_latency_ms': {'p50': pct(scan_latencies, 50), 'p95': pct(scan_latencies, 95), 'p99': pct(scan_latencies, 99)}}
+
+
+delivery_stats = DeliveryStats()
+
+
+class WebSocketClient:
+    """
+    One browser on /ws/barcode with its own bounded outbox and sender thread.
+
+    Producers only ever append to the outbox, so a slow or half-dead browser
+    can't stall scan delivery to the other tills. Scans can't be coalesced
+    (each one is a cart line), so a client whose outbox overflows is dropped
+    instead; the page reconnects on its own and tells the cashier.
+    """
+
+    def __init__(self, ws, remote_addr, max_queue=CLIENT_QUEUE_SIZE, registry=None):
+        self.ws = ws
+        self.registry = websocket_clients if registry is None else registry    # Where the client is listed while open
+        self.remote_addr = remote_addr
+        self.scanner_id = None    # Paired scanner; None = takes scans from any unpaired scanner
+        self.max_queue = max_queue
+        self.closed = False
+        self._outbox = deque()
+        self._ready = threading.Condition()
+        self._thread = threading.Thread(target=self._send_loop, daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self):
+        return len(self._outbox)
+
+    def enqueue(self, message, scan=None):
+        """Queues a message; `scan` carries a scan's timings so its delivery is logged end to end."""
+        with self._ready:
+            if self.closed: return False
+            if len(self._outbox) >= self.max_queue:
+                log_event(logging.WARNING, 'ws_client_dropped', client=self.remote_addr, queue_depth=len(self._outbox))
+                delivery_stats.count('slow_clients_dropped')
+                self._close_locked()
+                return False
+            self._outbox.append((time.perf_counter(), message, scan)); self._ready.notify()
+            return True
+
+    def close(self):
+        with self._ready: self._close_locked()
+
+    def _close_locked(self):
+        self.closed = True; self._outbox.clear(); self._ready.notify()
+        self.registry.pop(self.ws, None)
+
+    def _send_loop(self):
+        while True:
+            with self._ready:
+                while not self._outbox and not self.closed: self._ready.wait()
+                if self.closed: break
+                queued_at, message, scan = self._outbox.popleft()
+            try: self.ws.send(message)
+            except Exception as e:
+                log_event(logging.WARNING, 'ws_send_failed', client=self.remote_addr, error=str(e))
+                delivery_stats.count('failed'); self.close(); break
+            sent_at = time.perf_counter(); outbox_ms = (sent_at - queued_at) * 1000
+            if scan is None: delivery_stats.record(outbox_ms); continue
+            total_ms = (sent_at - scan['received_at']) * 1000
+            delivery_stats.record(outbox_ms, total_ms)
+            log_event(logging.INFO, 'scan_delivered', scanner_id=scan['scanner_id'], barcode=scan['barcode'], client=self.remote_addr,
+                      queue_ms=round(scan['queue_ms'], 3), lookup_ms=round(scan['lookup_ms'], 3), outbox_ms=round(outbox_ms, 3), total_ms=round(total_ms, 3))
+        try: self.ws.close()
+        except Exception: pass
+
+    def stats(self):
+        return {'remote_addr': self.remote_addr, 'scanner_id': self.scanner_id, 'queue_depth': self.queue_depth}
+
+
+def route_scan(app, scanner_id, barcode_data, received_at=None):
+    """
+    Queues a resolved scan for the POS sessions paired with its scanner, or for
+    unpaired sessions if it has none. `received_at` (perf_counter when the line
+    came off the TCP socket) times the scan through to the WebSocket send.
+    """
+    dispatched_at = time.perf_counter()
+    message = resolve_barcode(app, barcode_data); message['scanner_id'] = scanner_id
+    message = json.dumps(message)
+    received_at = received_at or dispatched_at
+    scan = {'scanner_id': scanner_id, 'barcode': barcode_data, 'received_at': received_at,
+            'queue_ms': (dispatched_at - received_at) * 1000, 'lookup_ms': (time.perf_counter() - dispatched_at) * 1000}
+    clients = list(websocket_clients.values())
+    targets = [client for client in clients if client.scanner_id == scanner_id]
+    if not targets and scanner_id not in {client.scanner_id for client in clients}:
+        targets = [client for client in clients if client.scanner_id is None]
+    if not targets: log_event(logging.INFO, 'scan_unrouted', scanner_id=scanner_id, barcode=barcode_data)
+    for client in targets: client.enqueue(message, scan)
+
+def websocket_stats():
+    stats = delivery_stats.snapshot()
+    stats['clients'] = [client.stats() for client in list(websocket_clients.values())]
+    return stats
+
+# --- Discovery Broadcast Thread ---
+def broadcast_presence(host_ip, tcp_port, stop_event):
+    broadcast_ip = get_broadcast_address(host_ip)
+    broadcast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    broadcast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    broadcast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    message = f"{DISCOVERY_MESSAGE.decode()}|{host_ip}|{tcp_port}".encode('utf-8')
+    log_event(logging.INFO, 'discovery_started', message=message.decode(), broadcast=f"{broadcast_ip}:{BROADCAST_PORT}")
+    while not stop_event.is_set():
+        try:
+            broadcast_socket.sendto(message, (broadcast_ip, BROADCAST_PORT))
+        except Exception as e:
+            if not stop_event.is_set():
+                log_event(logging.WARNING, 'discovery_error', error=str(e))
+        stop_event.wait(timeout=3.0)
+    broadcast_socket.close()
+    log_event(logging.INFO, 'discovery_stopped')
+
+# --- TCP Scanner Server ---
+class ScannerConnection:
+    def __init__(self, sock, addr, scanner_id):
+        self.sock = sock
+        self.addr = addr
+        self.scanner_id = scanner_id
+        self.buffer = bytearray()
+        self.pending = deque()    # (barcode, received_at) lines not yet accepted by the scan queue
+        self.greeted = False
+
+
+class ScannerServer:
+    """
+    Event-driven TCP server for any number of phone scanners.
+
+    One selector thread owns every socket and splits each connection's byte
+    stream into lines; a dispatcher thread does the (possibly slow) lookup and
+    WebSocket delivery through on_scan(scanner_id, barcode, received_at). The two are joined
+    by a bounded queue: when it fills up, the scanners' sockets are taken out
+    of the selector until it drains, so the kernel's TCP window pushes back on
+    the phones instead of this process buffering without limit.
+
+    A scanner is identified by its IP address, or by the name it announces
+    with a "SCANNER <id>" first line (used when several share one host).
+    """
+
+    def __init__(self, host, port, on_scan, stop_event, queue_size=SCAN_QUEUE_SIZE):
+        self.host = host
+        self.port = port
+        self.on_scan = on_scan
+        self.stop_event = stop_event
+        self.scans = queue.Queue(maxsize=queue_size)
+        self.selector = selectors.DefaultSelector()
+        self.connections = {}
+        self.paused = set()
+        self.ready = threading.Event()
+        self.thread = None
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._wakeup_send.setblocking(False)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def scanner_ids(self):
+        return sorted({conn.scanner_id for conn in list(self.connections.values())})
+
+    def serve_forever(self):
+        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        dispatcher = threading.Thread(target=self._dispatch_scans, daemon=True)
+        try:
+            server_socket.bind((self.host, self.port))
+            server_socket.listen(64)
+            server_socket.setblocking(False)
+            self.port = server_socket.getsockname()[1]
+            self.selector.register(server_socket, selectors.EVENT_READ, data=None)
+            self.selector.register(self._wakeup_recv, selectors.EVENT_READ, data=self._wakeup_recv)
+            dispatcher.start(); self.ready.set()
+            log_event(logging.INFO, 'tcp_listener_started', host=self.host, port=self.port)
+            while not self.stop_event.is_set():
+                self._resume_paused()
+                for key, _ in self.selector.select(timeout=0.5):
+                    if key.data is None: self._accept(server_socket)
+                    elif key.data is self._wakeup_recv: self._wakeup_recv.recv(4096)
+                    else: self._read(key.data)
+        except Exception as e:
+            if not self.stop_event.is_set(): log_event(logging.ERROR, 'tcp_listener_error', error=str(e))
+        finally:
+            self.ready.set()
+            for conn in list(self.connections.values()): self._close(conn)
+            self.selector.close(); server_socket.close()
+            self._wakeup_recv.close(); self._wakeup_send.close()
+            log_event(logging.INFO, 'tcp_listener_stopped')
+
+    def _accept(self, server_socket):
+        try: sock, addr = server_socket.accept()
+        except BlockingIOError: return
+        sock.setblocking(False)
+        scanner_id = addr[0]
+        if scanner_id in self.scanner_ids(): scanner_id = f"{addr[0]}:{addr[1]}"
+        conn = ScannerConnection(sock, addr, scanner_id)
+        self.connections[sock] = conn
+        self.selector.register(sock, selectors.EVENT_READ, data=conn)
+        log_event(logging.INFO, 'scanner_connected', scanner_id=scanner_id, addr=f"{addr[0]}:{addr[1]}")
+
+    def _read(self, conn):
+        try: data = conn.sock.recv(4096)
+        except (BlockingIOError, InterruptedError): return
+        except OSError as e:
+            log_event(logging.WARNING, 'scanner_recv_error', scanner_id=conn.scanner_id, error=str(e)); self._close(conn); return
+        if not data: self._close(conn); return
+        received_at = time.perf_counter()
+        conn.buffer += data
+        *lines, rest = conn.buffer.split(b'\n')
+        if len(rest) > MAX_LINE_BYTES:
+            log_event(logging.WARNING, 'scanner_line_too_long', scanner_id=conn.scanner_id, length=len(rest)); rest = b''
+        conn.buffer = bytearray(rest)
+        for line in lines:
+            barcode_data = line.decode('utf-8', errors='replace').strip()
+            if not barcode_data: continue
+            if not conn.greeted:
+                conn.greeted = True
+                if barcode_data.startswith(SCANNER_HELLO):
+                    conn.scanner_id = barcode_data[len(SCANNER_HELLO):].strip() or conn.scanner_id
+                    log_event(logging.INFO, 'scanner_identified', scanner_id=conn.scanner_id, addr=f"{conn.addr[0]}:{conn.addr[1]}")
+                    continue
+            log_event(logging.DEBUG, 'scan_received', scanner_id=conn.scanner_id, barcode=barcode_data)
+            conn.pending.append((barcode_data, received_at))
+        if not self._enqueue(conn):
+            # Queue full: stop reading this scanner until the dispatcher catches up
+            self.selector.unregister(conn.sock); self.paused.add(conn)
+
+    def _enqueue(self, conn):
+        while conn.pending:
+            try: self.scans.put_nowait((conn.scanner_id, *conn.pending[0]))
+            except queue.Full: return False
+            conn.pending.popleft()
+        return True
+
+    def _resume_paused(self):
+        for conn in list(self.paused):
+            if not self._enqueue(conn): break
+            self.paused.discard(conn)
+            self.selector.register(conn.sock, selectors.EVENT_READ, data=conn)
+
+    def _close(self, conn):
+        if conn in self.paused: self.paused.discard(conn)
+        else:
+            try: self.selector.unregister(conn.sock)
+            except (KeyError, ValueError): pass
+        self.connections.pop(conn.sock, None)
+        conn.sock.close()
+        log_event(logging.INFO, 'scanner_disconnected', scanner_id=conn.scanner_id)
+
+    def _dispatch_scans(self):
+        while not self.stop_event.is_set() or not self.scans.empty():
+            try: scanner_id, barcode_data, received_at = self.scans.get(timeout=0.5)
+            except queue.Empty: continue
+            if self.paused and self.scans.qsize() <= self.scans.maxsize // 2:
+                # Room again: wake the selector so it resumes reading the paused scanners
+                try: self._wakeup_send.send(b'\0')
+                except OSError: pass
+            try: self.on_scan(scanner_id, barcode_data, received_at)
+            except Exception as e: log_event(logging.ERROR, 'scan_delivery_error', scanner_id=scanner_id, barcode=barcode_data, error=str(e))
+
+# --- Start Background Threads ---
+def start_background_threads(app):
+    global scanner_server, broadcast_thread
+    host_ip = get_local_ip()
+
+    if scanner_server is None or not scanner_server.thread.is_alive():
+        stop_threads.clear()
+        tcp_host_ip = '0.0.0.0'
+        scanner_server = ScannerServer(
+            tcp_host_ip, TCP_HOST_PORT, lambda scanner_id, barcode_data, received_at: route_scan(app, scanner_id, barcode_data, received_at), stop_threads
+        ).start()
+
+    if broadcast_thread is None or not broadcast_thread.is_alive():
+        if stop_threads.is_set(): stop_threads.clear()
+        broadcast_thread = threading.Thread(
+            target=broadcast_presence, args=(host_ip, TCP_HOST_PORT, stop_threads), daemon=True
+        )
+        broadcast_thread.start()
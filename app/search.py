@@ -0,0 +1,245 @@
+# app/search.py
+import re
+import math
+import time
+import datetime
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from sqlalchemy import select, func
+from .models import db, Product
+
+_NON_WORD = re.compile(r'[^0-9a-z]+')
+FUZZY_MIN_SIMILARITY = 0.5    # Share of a query word's trigrams a catalog word must contain to replace it
+REFRESH_OVERLAP = datetime.timedelta(seconds=60)   # Re-read window for writes that committed after a later LastUpdated was seen
+
+
+def normalize(text):
+    return _NON_WORD.sub(' ', (text or '').lower()).strip()
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Document:
+    __slots__ = ('product_id', 'name', 'name_tokens', 'text_tokens', 'barcode')
+
+    def __init__(self, product_id, name, barcode, description):
+        self.product_id = product_id
+        self.name = normalize(name)
+        self.name_tokens = self.name.split()
+        self.text_tokens = sorted(set(self.name_tokens) | set(normalize(description).split()))
+        self.barcode = (barcode or '').strip().lower() or None
+
+
+class ProductSearchIndex:
+    """
+    In-memory product search over names, barcodes and descriptions.
+
+    Every structure is a sorted list searched with bisect, so a prefix lookup
+    costs O(log n) plus the rows returned and the common case (the user is
+    typing the start of a name) never touches more than `limit` entries.
+    Results are ranked in tiers and a lower tier is only searched when the
+    ones above it haven't filled the page:
+
+        1. exact barcode, then barcode prefix
+        2. whole name starts with the query
+        3. every query word is the prefix of a word in the name
+        4. every query word is the prefix of a word in the name or description
+        5. fuzzy: tiers 3 and 4 again after replacing each query word that
+           matches nothing with the catalog word sharing most of its trigrams
+
+    Typo correction works on the vocabulary of distinct words rather than
+    on products, so its cost doesn't grow with the size of the catalog.
+
+    The index returns ProductIDs only; callers load the rows so price and
+    stock are always current. Writers call upsert()/remove() after commit;
+    writes from other processes are picked up by refresh().
+    """
+
+    def __init__(self, refresh_interval=30):
+        self._lock = threading.RLock()
+        self.refresh_interval = refresh_interval
+        self._watermark_seen = None    # (product count, max LastUpdated) as of the last build/refresh
+        self._checked_at = 0.0
+        self._reset()
+
+    def _reset(self):
+        self.built = False
+        self._docs = {}
+        self._names = []          # (name, product_id)
+        self._name_tokens = []    # (token, name, product_id)
+        self._text_tokens = []    # (token, name, product_id) over name and description words
+        self._barcodes = []       # (barcode, product_id)
+        self._vocabulary = Counter()    # word -> number of products using it
+        self._trigrams = {}             # trigram -> set(word), for alphabetic words
+
+    def init_app(self, app):
+        self.refresh_interval = app.config.get('SEARCH_INDEX_REFRESH_SECONDS', self.refresh_interval)
+        if app.config.get('SEARCH_INDEX_BUILD', True):
+            with app.app_context():
+                try: self.build()
+                except Exception as e: app.logger.warning(f"Product search index not built: {e}")
+
+    def build(self):
+        watermark = self._watermark()    # read first: anything committed while the rows load shows up at the next refresh
+        self.load(Product.query.with_entities(Product.ProductID, Product.ProductName, Product.Barcode, Product.Description).all())
+        with self._lock: self._watermark_seen = watermark; self._checked_at = time.monotonic()
+
+    # --- writes from other processes (workers, CLI imports, seed scripts) ---
+    @staticmethod
+    def _watermark():
+        return tuple(db.session.execute(select(func.count(), func.max(Product.LastUpdated)).select_from(Product)).one())
+
+    def _refresh_due(self):
+        with self._lock:
+            if self._watermark_seen is None or not self.refresh_interval or time.monotonic() - self._checked_at < self.refresh_interval: return False
+            self._checked_at = time.monotonic(); return True
+
+    def refresh(self):
+        """
+        Catches up with products written by other processes: one count /
+        max(LastUpdated) query, and only if that moved, the rows updated since
+        the last look (REFRESH_OVERLAP earlier, for transactions that committed
+        late). A count that still disagrees with the index (a delete, or rows
+        without LastUpdated) rebuilds it.
+        """
+        watermark = self._watermark()
+        with self._lock: seen = self._watermark_seen
+        if watermark == seen: return
+        count, latest = watermark
+        if seen is None or seen[1] is None: self.build(); return
+        rows = db.session.execute(select(Product.ProductID, Product.ProductName, Product.Barcode, Product.Description)
+                                  .where(Product.LastUpdated >= seen[1] - REFRESH_OVERLAP)).all()
+        if len(rows) > max(1000, len(self) // 10): self.build(); return    # a bulk import: one sorted load beats many inserts
+        for row in rows: self.add(*row)
+        if len(self) != count: self.build(); return
+        with self._lock: self._watermark_seen = watermark
+
+    def load(self, rows):
+        """Replaces the index contents with (product_id, name, barcode, description) rows."""
+        with self._lock:
+            self._reset()
+            for row in rows: self._add(_Document(*row), bulk=True)
+            self._names.sort(); self._name_tokens.sort(); self._text_tokens.sort(); self._barcodes.sort()
+            self.built = True
+
+    def add(self, product_id, name, barcode=None, description=None):
+        with self._lock:
+            self._remove(product_id)
+            self._add(_Document(product_id, name, barcode, description))
+
+    def upsert(self, product_id):
+        row = Product.query.with_entities(Product.ProductID, Product.ProductName, Product.Barcode, Product.Description).filter_by(ProductID=product_id).first()
+        if row: self.add(*row)
+        else: self.remove(product_id)
+
+    def remove(self, product_id):
+        with self._lock: self._remove(product_id)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def search(self, query, limit=20):
+        if not self.built: self.build()
+        elif self._refresh_due(): self.refresh()
+        q = normalize(query); tokens = q.split()
+        with self._lock:
+            results = []; seen = set()
+            def take(product_ids):
+                for product_id in product_ids:
+                    if product_id not in seen:
+                        seen.add(product_id); results.append(product_id)
+                        if len(results) >= limit: return True
+                return False
+
+            raw = query.strip().lower()
+            if raw and take(pid for _, pid in self._prefix_range(self._barcodes, (raw,))):
+                return results
+            if take(pid for _, pid in self._prefix_range(self._names, (q,))) or not tokens:
+                return results
+            word_tiers = ((self._name_tokens, 'name_tokens'), (self._text_tokens, 'text_tokens'))
+            for entries, field in word_tiers:
+                if take(self._token_matches(entries, field, tokens)): return results
+            corrected = [self._correct(token) for token in tokens]
+            if corrected != tokens and None not in corrected:
+                for entries, field in word_tiers:
+                    if take(self._token_matches(entries, field, corrected)): return results
+            return results
+
+    # --- internals (caller holds the lock) ---
+    def _add(self, doc, bulk=False):
+        add = list.append if bulk else insort
+        self._docs[doc.product_id] = doc
+        add(self._names, (doc.name, doc.product_id))
+        for token in doc.name_tokens: add(self._name_tokens, (token, doc.name, doc.product_id))
+        for token in doc.text_tokens: add(self._text_tokens, (token, doc.name, doc.product_id))
+        if doc.barcode: add(self._barcodes, (doc.barcode, doc.product_id))
+        for word in doc.text_tokens:
+            self._vocabulary[word] += 1
+            if self._vocabulary[word] == 1 and not word.isdigit():
+                for trigram in trigrams(word): self._trigrams.setdefault(trigram, set()).add(word)
+
+    def _remove(self, product_id):
+        doc = self._docs.pop(product_id, None)
+        if not doc: return
+        self._discard(self._names, (doc.name, product_id))
+        for token in doc.name_tokens: self._discard(self._name_tokens, (token, doc.name, product_id))
+        for token in doc.text_tokens: self._discard(self._text_tokens, (token, doc.name, product_id))
+        if doc.barcode: self._discard(self._barcodes, (doc.barcode, product_id))
+        for word in doc.text_tokens:
+            self._vocabulary[word] -= 1
+            if self._vocabulary[word] > 0: continue
+            del self._vocabulary[word]
+            for trigram in trigrams(word):
+                postings = self._trigrams.get(trigram)
+                if postings is not None:
+                    postings.discard(word)
+                    if not postings: del self._trigrams[trigram]
+
+    @staticmethod
+    def _discard(entries, entry):
+        i = bisect_left(entries, entry)
+        if i < len(entries) and entries[i] == entry: del entries[i]
+
+    @staticmethod
+    def _prefix_range(entries, prefix):
+        i = bisect_left(entries, prefix)
+        while i < len(entries) and entries[i][0].startswith(prefix[0]):
+            yield entries[i]; i += 1
+
+    @staticmethod
+    def _prefix_bounds(entries, prefix):
+        return bisect_left(entries, (prefix,)), bisect_left(entries, (prefix + '\uffff',))
+
+    def _token_matches(self, entries, field, tokens):
+        if len(tokens) == 1:
+            return (product_id for *_, product_id in self._prefix_range(entries, (tokens[0],)))
+        # Several words: start from the rarest word's range and narrow it down by
+        # each of the others, either by set intersection or, when that word's
+        # range dwarfs the candidates left, by checking the candidates' words
+        bounds = sorted(((self._prefix_bounds(entries, token), token) for token in tokens), key=lambda b: b[0][1] - b[0][0])
+        (lo, hi), _ = bounds[0]
+        matches = {entry[2] for entry in entries[lo:hi]}
+        for (lo, hi), token in bounds[1:]:
+            if not matches: break
+            if hi - lo > 8 * len(matches):
+                matches = {product_id for product_id in matches if any(word.startswith(token) for word in getattr(self._docs[product_id], field))}
+            else:
+                matches &= {entry[2] for entry in entries[lo:hi]}
+        return sorted(matches, key=lambda product_id: self._docs[product_id].name)
+
+    def _correct(self, token):
+        """Returns the token if it prefixes a catalog word, else its closest catalog word (or None)."""
+        lo, hi = self._prefix_bounds(self._text_tokens, token)
+        if hi > lo or token.isdigit(): return token
+        query_trigrams = trigrams(token)
+        needed = max(1, math.ceil(len(query_trigrams) * FUZZY_MIN_SIMILARITY))
+        shared = Counter()
+        for trigram in query_trigrams: shared.update(self._trigrams.get(trigram, ()))
+        best = max(((count, -abs(len(word) - len(token)), self._vocabulary[word], word) for word, count in shared.items() if count >= needed), default=None)
+        return best[-1] if best else None
+
+search_index = ProductSearchIndex()
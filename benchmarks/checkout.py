@@ -0,0 +1,64 @@
+# benchmarks/checkout.py
+"""
+Measures checkout latency and SQL statement count against basket size.
+
+    python -m benchmarks.checkout --database-uri sqlite:// --sizes 1 10 50 200
+
+The engine issues the same number of statements whatever the basket size, so
+the per-sale latency should stay roughly flat as the basket grows. Uses a
+throwaway database: never point it at production.
+"""
+import argparse
+import statistics
+import time
+from sqlalchemy import event
+from app import create_app
+from app.models import db, Product, Category
+from app.checkout import process_checkout
+from config import profile_for_uri
+
+
+def make_app(database_uri, **engine_options):
+    profile = profile_for_uri(database_uri)
+    class BenchConfig(profile):
+        SQLALCHEMY_DATABASE_URI = database_uri
+        SQLALCHEMY_ENGINE_OPTIONS = {**getattr(profile, 'SQLALCHEMY_ENGINE_OPTIONS', {}), **engine_options}
+    return create_app(BenchConfig)
+
+
+def seed_products(count):
+    category = Category(CategoryName='Benchmark'); db.session.add(category); db.session.flush()
+    db.session.add_all([Product(ProductName=f"Bench Product {i}", Price=1.25, StockQuantity=10**9, CategoryID=category.CategoryID) for i in range(count)])
+    db.session.commit()
+    return [pid for (pid,) in db.session.query(Product.ProductID).order_by(Product.ProductID)]
+
+
+def run(database_uri, sizes, rounds):
+    app = make_app(database_uri)
+    with app.app_context():
+        db.create_all()
+        product_ids = seed_products(max(sizes))
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(1))
+        print(f"{'basket':>8} {'p50 ms':>10} {'p95 ms':>10} {'stmts':>6}")
+        for size in sizes:
+            cart = [{'product_id': pid, 'quantity': 1} for pid in product_ids[:size]]
+            timings = []
+            for _ in range(rounds):
+                statements.clear()
+                started = time.perf_counter()
+                process_checkout(cart, None, 'Cash'); db.session.commit()
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(f"{size:>8} {statistics.median(timings):>10.2f} {p95:>10.2f} {len(statements):>6}")
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-uri', default='sqlite://')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 5, 25, 100, 250])
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+    run(args.database_uri, args.sizes, args.rounds)
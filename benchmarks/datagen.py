@@ -0,0 +1,178 @@
+# benchmarks/datagen.py
+"""
+Fills the schema with synthetic data at production-like volumes.
+
+    python -m benchmarks.datagen --database-uri sqlite:///bench.db --products 100000 --customers 1000000 --sale-lines 10000000
+
+Rows go in with bulk INSERTs of --batch-size rows, a commit per batch, so memory
+stays flat whatever the volume. Sales are spread over the last --days days with
+a slow growth trend, busier Fridays/Saturdays and lunch/evening peaks, and are
+written in date order so SaleID follows SaleDate as it does in production.
+Product popularity is Zipf-like, so a few hundred products carry most sales.
+The daily rollups are rebuilt at the end. Adds to whatever is already there:
+point it at an empty or throwaway database, never at production.
+"""
+import argparse
+import datetime
+import itertools
+import math
+import os
+import random
+import time
+from sqlalchemy import insert, func, select, literal
+from app import create_app, rollup
+from app.models import db, Category, Supplier, Product, Customer, Sale, SaleDetail, User, InventoryLog
+from config import profile_for_uri
+from benchmarks.search import BRANDS, ITEMS, SIZES
+
+CATEGORIES = ['Fruits', 'Vegetables', 'Dairy', 'Bakery', 'Meat', 'Seafood', 'Frozen', 'Pantry', 'Snacks', 'Beverages',
+              'Household', 'Personal Care', 'Baby', 'Pet', 'Deli', 'Bulk']
+FIRST_NAMES = ['Ava', 'Ben', 'Chloe', 'Dev', 'Ella', 'Finn', 'Grace', 'Hari', 'Isla', 'Jon', 'Kira', 'Liam', 'Maya', 'Noah',
+               'Omar', 'Priya', 'Quinn', 'Rosa', 'Sam', 'Tara', 'Uma', 'Vik', 'Wren', 'Yara', 'Zane']
+LAST_NAMES = ['Adams', 'Brown', 'Chen', 'Diaz', 'Evans', 'Fischer', 'Garcia', 'Hughes', 'Ito', 'Jones', 'Khan', 'Lopez',
+              'Miller', 'Nguyen', 'Okafor', 'Patel', 'Reyes', 'Singh', 'Taylor', 'Walker']
+PAYMENT_METHODS = (['Card'] * 6) + (['Cash'] * 3) + ['Other']
+# Relative traffic per hour of day (store open 07:00-22:00), weekday (Mon..Sun), and items per basket
+HOUR_WEIGHTS = [0] * 7 + [2, 4, 5, 6, 9, 10, 8, 6, 6, 7, 10, 11, 9, 6, 3] + [0] * 2
+WEEKDAY_WEIGHTS = [0.9, 0.85, 0.9, 1.0, 1.25, 1.35, 1.1]
+BASKET_WEIGHTS = [30, 20, 14, 10, 8, 6, 4, 3, 2, 2, 1]
+
+BENCH_ADMIN = ('bench_admin', 'bench_admin')
+
+
+def make_app(database_uri):
+    class BenchConfig(profile_for_uri(database_uri)):
+        SQLALCHEMY_DATABASE_URI = database_uri
+        SECRET_KEY = os.environ.get('FLASK_SECRET_KEY') or 'benchmark'
+    return create_app(BenchConfig)
+
+
+def next_id(column):
+    return (db.session.scalar(select(func.max(column))) or 0) + 1
+
+
+def insert_batches(model, rows, batch_size):
+    """Bulk-inserts an iterable of row dicts, committing every batch_size rows. Returns the row count."""
+    batch, count = [], 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(insert(model), batch); db.session.commit(); count += len(batch); batch = []
+    if batch: db.session.execute(insert(model), batch); db.session.commit(); count += len(batch)
+    return count
+
+
+def ensure_bench_admin():
+    """The admin account the load suite logs in with."""
+    username, password = BENCH_ADMIN
+    if not User.query.filter_by(Username=username).first():
+        user = User(Username=username, Role='admin'); user.set_password(password)
+        db.session.add(user); db.session.commit()
+    return BENCH_ADMIN
+
+
+def product_rows(rng, first_id, count, category_ids, supplier_ids):
+    for product_id in range(first_id, first_id + count):
+        yield {'ProductID': product_id, 'ProductName': f"{rng.choice(BRANDS)} {rng.choice(ITEMS)} {rng.choice(SIZES)} #{product_id}",
+               'Description': f"{rng.choice(ITEMS)} and more", 'CategoryID': rng.choice(category_ids), 'SupplierID': rng.choice(supplier_ids),
+               # ~5% of the catalog sits under the low-stock threshold
+               'Price': round(rng.lognormvariate(1.2, 0.7), 2) or 0.05, 'StockQuantity': rng.randint(0, 9) if rng.random() < 0.05 else rng.randint(10, 500),
+               'Barcode': f"{200000000000 + product_id}"}
+
+
+def customer_rows(rng, first_id, count, now):
+    for customer_id in range(first_id, first_id + count):
+        yield {'CustomerID': customer_id, 'FirstName': rng.choice(FIRST_NAMES), 'LastName': rng.choice(LAST_NAMES),
+               'Email': f"customer{customer_id}@example.com", 'PhoneNumber': f"555{customer_id:07d}",
+               'RegistrationDate': now - datetime.timedelta(days=rng.randint(0, 1000))}
+
+
+def sales_per_day(total_sales, days, today):
+    """Sales for each of the last `days` days (oldest first): +30% growth over the window plus weekday seasonality."""
+    weights = [(1 + 0.3 * i / max(days - 1, 1)) * WEEKDAY_WEIGHTS[(today - datetime.timedelta(days=days - 1 - i)).weekday()] for i in range(days)]
+    scale = total_sales / sum(weights); counts, carry = [], 0.0
+    for weight in weights:
+        carry += weight * scale; counts.append(int(carry)); carry -= int(carry)
+    return counts
+
+
+def sale_rows(rng, first_sale_id, first_line_id, sale_lines, days, products, customer_ids, guest_ratio=0.4):
+    """Yields (sale, [lines]) in date order until about `sale_lines` lines have been produced."""
+    product_ids, prices = products
+    popularity = list(range(len(product_ids))); rng.shuffle(popularity)
+    cum_popularity = list(itertools.accumulate(1 / (rank + 1) ** 0.9 for rank in popularity))
+    basket_sizes = list(range(1, len(BASKET_WEIGHTS) + 1))
+    mean_basket = sum(size * weight for size, weight in zip(basket_sizes, BASKET_WEIGHTS)) / sum(BASKET_WEIGHTS)
+    today = datetime.date.today(); sale_id, line_id = first_sale_id, first_line_id
+    for offset, count in enumerate(sales_per_day(math.ceil(sale_lines / mean_basket), days, today)):
+        day = today - datetime.timedelta(days=days - 1 - offset)
+        for second in sorted(hour * 3600 + rng.randrange(3600) for hour in rng.choices(range(24), weights=HOUR_WEIGHTS, k=count)):
+            picks = set(rng.choices(range(len(product_ids)), cum_weights=cum_popularity, k=rng.choices(basket_sizes, weights=BASKET_WEIGHTS)[0]))
+            lines, total = [], 0
+            for index in sorted(picks):
+                quantity = rng.choices((1, 2, 3, 4), weights=(70, 18, 8, 4))[0]; line_total = round(prices[index] * quantity, 2); total += line_total
+                lines.append({'SaleDetailID': line_id, 'SaleID': sale_id, 'ProductID': product_ids[index], 'Quantity': quantity, 'UnitPrice': prices[index], 'TotalPrice': line_total})
+                line_id += 1
+            customer_id = None if not customer_ids or rng.random() < guest_ratio else rng.randint(*customer_ids)
+            sale_date = datetime.datetime.combine(day, datetime.time.min) + datetime.timedelta(seconds=second)
+            yield {'SaleID': sale_id, 'CustomerID': customer_id, 'SaleDate': sale_date, 'TotalAmount': round(total, 2), 'PaymentMethod': rng.choice(PAYMENT_METHODS)}, lines
+            sale_id += 1
+
+
+def generate(products=2000, customers=5000, sale_lines=50000, days=90, batch_size=5000, seed=42, log=print):
+    """Adds synthetic categories, suppliers, products, customers and sales to the current app's database. Returns the row counts."""
+    rng = random.Random(seed); now = datetime.datetime.utcnow(); counts = {}
+    started = time.perf_counter()
+    def done(table, count):
+        counts[table] = count; log(f"{table:<12} {count:>10} rows  {time.perf_counter() - started:8.1f}s")
+
+    existing = {name for (name,) in db.session.query(Category.CategoryName)}
+    if set(CATEGORIES) - existing: db.session.execute(insert(Category), [{'CategoryName': name} for name in CATEGORIES if name not in existing]); db.session.commit()
+    category_ids = [cid for (cid,) in db.session.query(Category.CategoryID)]
+    first = next_id(Supplier.SupplierID)
+    done('suppliers', insert_batches(Supplier, ({'SupplierID': i, 'SupplierName': f"Bench Supplier {i}"} for i in range(first, first + 50)), batch_size))
+    supplier_ids = list(range(first, first + 50))
+    ensure_bench_admin()
+
+    first = next_id(Product.ProductID)
+    done('products', insert_batches(Product, product_rows(rng, first, products, category_ids, supplier_ids), batch_size))
+    # Opening balances in the ledger, dated before the generated sales, so `flask ledger reconcile` starts clean
+    db.session.execute(insert(InventoryLog).from_select(['ProductID', 'ChangeType', 'QuantityChange', 'ChangeDate', 'Notes'], select(
+        Product.ProductID, literal('Initial Stock'), Product.StockQuantity, literal(now - datetime.timedelta(days=days + 1)), literal('Synthetic data'))
+        .where(Product.ProductID >= first, Product.StockQuantity > 0))); db.session.commit()
+    catalog = db.session.execute(select(Product.ProductID, Product.Price).order_by(Product.ProductID)).all()
+    catalog = ([row.ProductID for row in catalog], [float(row.Price) for row in catalog])
+
+    first = next_id(Customer.CustomerID)
+    done('customers', insert_batches(Customer, customer_rows(rng, first, customers, now), batch_size))
+    customer_ids = (1, first + customers - 1) if first + customers > 1 else None
+
+    sales, lines = [], []; sale_count = line_count = 0
+    for sale, sale_lines_ in sale_rows(rng, next_id(Sale.SaleID), next_id(SaleDetail.SaleDetailID), sale_lines, days, catalog, customer_ids):
+        sales.append(sale); lines.extend(sale_lines_)
+        if len(lines) >= batch_size:
+            db.session.execute(insert(Sale), sales); db.session.execute(insert(SaleDetail), lines); db.session.commit()
+            if (line_count + len(lines)) // 1000000 > line_count // 1000000: log(f"{'':<12} {line_count + len(lines):>10} sale lines so far")
+            sale_count += len(sales); line_count += len(lines); sales, lines = [], []
+    if sales: db.session.execute(insert(Sale), sales); db.session.execute(insert(SaleDetail), lines); db.session.commit(); sale_count += len(sales); line_count += len(lines)
+    done('sales', sale_count); done('sale_lines', line_count)
+
+    rollup.rebuild(); db.session.commit()
+    log(f"{'rollups':<12} {'rebuilt':>10}       {time.perf_counter() - started:8.1f}s")
+    return counts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-uri', default='sqlite:///bench.db')
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--customers', type=int, default=5000)
+    parser.add_argument('--sale-lines', type=int, default=50000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    app = make_app(args.database_uri)
+    with app.app_context():
+        db.create_all()
+        generate(args.products, args.customers, args.sale_lines, args.days, args.batch_size, args.seed)
@@ -0,0 +1,220 @@
+# benchmarks/load.py
+"""
+Drives the key endpoints through the Flask test client and reports latency
+percentiles and throughput per scenario.
+
+    python -m benchmarks.load                                   # in-memory SQLite with generated data
+    python -m benchmarks.load --database-uri sqlite:///bench.db --no-generate --concurrency 4
+    python -m benchmarks.load --scenarios checkout product_search --baseline load-previous.json
+
+Each scenario runs --warmup untimed requests, then --requests timed ones spread
+over --concurrency threads (one logged-in test client each). Latency covers the
+whole request including reading the body, so streamed exports are timed to the
+last byte. Results (p50/p95/p99, mean, max, throughput, SQL statements per
+request, errors) are written to --output as JSON with the dataset volumes and
+the git commit; --baseline prints the p95 change against an earlier run.
+
+Writes sales (checkout): use a throwaway database, never production.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+from sqlalchemy import event, func, select
+from app.models import db, Product, Customer, Sale, SaleDetail
+from app.search import search_index
+from app.barcode_cache import barcode_cache
+from app.response_cache import response_cache
+from benchmarks.datagen import make_app, generate, ensure_bench_admin
+
+
+# --- SCENARIOS ---
+# Each takes (client, rng, sample) and returns the response; `ok` says which statuses count as success.
+def checkout(client, rng, sample):
+    cart = [{'product_id': pid, 'quantity': 1} for pid in rng.sample(sample['stocked'], rng.randint(1, 5))]
+    return client.post('/sales/new', data={'cart_data': json.dumps(cart), 'payment_method': 'Card',
+                                           'customer_id': str(rng.choice(sample['customers'])) if sample['customers'] and rng.random() < 0.6 else ''})
+
+def product_search(client, rng, sample):
+    words = rng.choice(sample['names']).split()
+    return client.get('/api/products/search', query_string={'q': ' '.join(words[:2])[:rng.randint(3, 12)]})
+
+def customer_search(client, rng, sample):
+    return client.get('/api/customers/search', query_string={'q': rng.choice(sample['customer_names'])[:rng.randint(2, 5)]})
+
+def barcode_lookup(client, rng, sample):
+    return client.get(f"/api/products/by_barcode/{rng.choice(sample['barcodes'])}")
+
+def dashboard(client, rng, sample):
+    return client.get('/')
+
+def chart(path):
+    def scenario(client, rng, sample): return client.get(path)
+    return scenario
+
+def sales_history(client, rng, sample):
+    return client.get('/sales/history')
+
+def sales_history_filtered(client, rng, sample):
+    day = datetime.date.today() - datetime.timedelta(days=rng.randint(0, 60))
+    return client.get('/sales/history', query_string={'start_date': (day - datetime.timedelta(days=6)).isoformat(), 'end_date': day.isoformat()})
+
+def customer_history(client, rng, sample):
+    return client.get(f"/customers/{rng.choice(sample['customers'])}/history")
+
+def sale_details(client, rng, sample):
+    return client.get(f"/sales/details/{rng.choice(sample['sales'])}")
+
+def export_sales_week(client, rng, sample):
+    return client.get('/export/sales_csv', query_string={'start_date': (datetime.date.today() - datetime.timedelta(days=6)).isoformat()})
+
+def export_line_items_week(client, rng, sample):
+    return client.get('/export/sales_csv', query_string={'start_date': (datetime.date.today() - datetime.timedelta(days=6)).isoformat(), 'detail': 'items', 'gzip': '1'})
+
+def export_low_stock(client, rng, sample):
+    return client.get('/export/low_stock_csv')
+
+SCENARIOS = {
+    'checkout': (checkout, lambda r: r.status_code == 302 and '/sales/receipt/' in r.headers.get('Location', '')),
+    'product_search': (product_search, None), 'customer_search': (customer_search, None), 'barcode_lookup': (barcode_lookup, None),
+    'dashboard': (dashboard, None),
+    'chart_last_7_days': (chart('/api/sales/last_7_days'), None), 'chart_by_category': (chart('/api/sales/by_category'), None),
+    'chart_best_sellers': (chart('/api/products/best_sellers'), None),
+    'sales_history': (sales_history, None), 'sales_history_week': (sales_history_filtered, None),
+    'customer_history': (customer_history, None), 'sale_details': (sale_details, None),
+    'export_sales_week': (export_sales_week, None), 'export_line_items_week': (export_line_items_week, None),
+    'export_low_stock': (export_low_stock, None),
+}
+
+
+def load_sample(size=5000):
+    """IDs and strings the scenarios pick from: recent sales and their customers, barcoded and well-stocked products."""
+    products = db.session.execute(select(Product.ProductID, Product.ProductName, Product.Barcode, Product.StockQuantity)
+                                  .where(Product.Barcode.isnot(None)).order_by(Product.ProductID).limit(size)).all()
+    sales = db.session.scalars(select(Sale.SaleID).order_by(Sale.SaleID.desc()).limit(size)).all()
+    customers = sorted(set(db.session.scalars(select(Sale.CustomerID).where(Sale.CustomerID.isnot(None)).order_by(Sale.SaleID.desc()).limit(size))))
+    names = db.session.scalars(select(Customer.LastName).where(Customer.CustomerID.in_(customers[:200]))).all() if customers else []
+    sample = {'names': [p.ProductName for p in products], 'barcodes': [p.Barcode for p in products],
+              'stocked': [p.ProductID for p in products if p.StockQuantity >= 100], 'sales': sales, 'customers': customers,
+              'customer_names': [name for name in names if name] or ['a']}
+    if len(sample['stocked']) < 5 or not sales or not customers:
+        raise SystemExit("Not enough data to benchmark against: run with generation enabled or benchmarks.datagen first.")
+    return sample
+
+
+def volumes():
+    return {model.__tablename__: db.session.scalar(select(func.count()).select_from(model)) for model in (Product, Customer, Sale, SaleDetail)}
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))]
+
+
+def logged_in_client(app, credentials):
+    client = app.test_client()
+    response = client.post('/login', data={'username': credentials[0], 'password': credentials[1]})
+    if response.status_code != 302: raise SystemExit("Could not log in as the benchmark admin.")
+    return client
+
+
+def run_scenario(app, credentials, sample, name, requests, concurrency, warmup, seed):
+    scenario, ok = SCENARIOS[name]; ok = ok or (lambda r: r.status_code == 200)
+    timings, errors, lock = [], [], threading.Lock()
+    per_thread = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+
+    clients = [logged_in_client(app, credentials) for _ in range(concurrency)]
+    rngs = [random.Random(seed + index) for index in range(concurrency)]
+    for _ in range(warmup): scenario(clients[0], rngs[0], sample).get_data()
+
+    def worker(index, count):
+        client, rng = clients[index], rngs[index]
+        barrier.wait()
+        mine, failed = [], []
+        for _ in range(count):
+            started = time.perf_counter()
+            response = scenario(client, rng, sample); response.get_data()
+            mine.append((time.perf_counter() - started) * 1000)
+            if not ok(response): failed.append(response.status_code)
+        with lock: timings.extend(mine); errors.extend(failed)
+
+    clock = {}
+    def start_clock(): statements.clear(); clock['started'] = time.perf_counter()
+    # Timing starts once every thread is running
+    barrier = threading.Barrier(concurrency, action=start_clock)
+    threads = [threading.Thread(target=worker, args=(i, count)) for i, count in enumerate(per_thread)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    elapsed = time.perf_counter() - clock['started']
+    timings.sort()
+    return {'requests': len(timings), 'errors': len(errors), 'error_statuses': sorted(set(errors)),
+            'p50_ms': round(percentile(timings, 50), 3), 'p95_ms': round(percentile(timings, 95), 3), 'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3), 'max_ms': round(timings[-1], 3),
+            'throughput_rps': round(len(timings) / elapsed, 1), 'sql_per_request': round(len(statements) / len(timings), 2)}
+
+
+def git_commit():
+    try: return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError): return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f: baseline = json.load(f).get('scenarios', {})
+    print(f"\n{'vs ' + baseline_path:<28} {'p95 before':>11} {'p95 now':>10} {'change':>8}")
+    for name, result in results.items():
+        before = baseline.get(name, {}).get('p95_ms')
+        if before: print(f"{name:<28} {before:>11.2f} {result['p95_ms']:>10.2f} {(result['p95_ms'] - before) / before * 100:>+7.1f}%")
+
+
+statements = []
+
+def run(args):
+    app = make_app(args.database_uri)
+    with app.app_context():
+        db.create_all()
+        engine = db.engine
+        if engine.dialect.name == 'sqlite' and engine.url.database in (None, '', ':memory:') and args.concurrency > 1:
+            raise SystemExit("In-memory SQLite shares one connection: use a file or server database for --concurrency > 1.")
+        if args.generate: generate(args.products, args.customers, args.sale_lines, args.days, seed=args.seed)
+        credentials = ensure_bench_admin()
+        search_index.build(); barcode_cache.clear(); response_cache.clear()
+        sample = load_sample(); dataset = volumes()
+    event.listen(engine, 'before_cursor_execute', lambda *a: statements.append(1))
+
+    print(f"{'scenario':<24} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8} {'sql':>6} {'errors':>7}")
+    results = {}
+    for name in args.scenarios:
+        result = results[name] = run_scenario(app, credentials, sample, name, args.requests, args.concurrency, args.warmup, args.seed)
+        print(f"{name:<24} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['throughput_rps']:>8.1f} {result['sql_per_request']:>6.1f} {result['errors']:>7}")
+
+    report = {'started_at': datetime.datetime.now().isoformat(timespec='seconds'), 'git_commit': git_commit(), 'python': platform.python_version(),
+              'database': f"{engine.dialect.name}+{engine.dialect.driver}", 'dataset': dataset,
+              'settings': {'requests': args.requests, 'concurrency': args.concurrency, 'warmup': args.warmup, 'seed': args.seed},
+              'scenarios': results}
+    output = args.output or f"load-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, 'w') as f: json.dump(report, f, indent=2)
+    print(f"\nwrote {output}")
+    if args.baseline: compare(results, args.baseline)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-uri', default='sqlite://')
+    parser.add_argument('--no-generate', dest='generate', action='store_false', help='benchmark the data already in the database')
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--customers', type=int, default=5000)
+    parser.add_argument('--sale-lines', type=int, default=50000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='JSON report path (default load-<timestamp>.json)')
+    parser.add_argument('--baseline', help='earlier JSON report to compare p95 latency against')
+    run(parser.parse_args())
@@ -0,0 +1,49 @@
+# benchmarks/replenishment.py
+"""
+Times the nightly replenishment run (`flask replenish run`) at catalog scale.
+
+    python -m benchmarks.replenishment --database-uri sqlite:///replenish.db --products 100000 --sale-lines 5000000 --days 365
+
+Fills the database with benchmarks.datagen (skip with --no-generate to reuse
+one), then runs the velocity query, the planning pass and the drafting of
+purchase orders --repeat times and reports each phase. The first draft
+replaces nothing; later ones also delete the drafts the previous run left.
+"""
+import argparse
+import statistics
+import time
+from sqlalchemy import func, select
+from app import replenishment
+from app.models import db, Product, DailyProductSales
+from benchmarks.datagen import make_app, generate
+
+
+def run(repeat):
+    print(f"{db.session.scalar(select(func.count()).select_from(Product))} products, "
+          f"{db.session.scalar(select(func.count()).select_from(DailyProductSales))} product-day rollup rows")
+    timings = {}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        plan = replenishment.plan(); orders = replenishment.draft_purchase_orders(plan); db.session.commit()
+        plan.timings['total_s'] = round(time.perf_counter() - started, 3)
+        for phase, seconds in plan.timings.items(): timings.setdefault(phase, []).append(seconds)
+    print(f"{len(plan.lines)} products to order across {len(orders)} draft POs, {len(plan.unassigned)} without a supplier")
+    print(f"{'phase':<12} {'p50 s':>8} {'max s':>8}")
+    for phase, values in timings.items(): print(f"{phase:<12} {statistics.median(values):>8.3f} {max(values):>8.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-uri', default='sqlite:///replenish.db')
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--customers', type=int, default=50000)
+    parser.add_argument('--sale-lines', type=int, default=5000000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--no-generate', action='store_true', help='Reuse the data already in the database.')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    app = make_app(args.database_uri)
+    with app.app_context():
+        db.create_all()
+        if not args.no_generate: generate(args.products, args.customers, args.sale_lines, args.days)
+        run(args.repeat)
@@ -0,0 +1,76 @@
+# benchmarks/scanner_load.py
+"""
+Load-tests the TCP scanner server with many simulated phone scanners.
+
+    python -m benchmarks.scanner_load --scanners 50 --scans 200 --rate 50
+
+By default an in-process ScannerServer is started on a free port with a
+dispatcher that only records arrival times, so the numbers reflect the
+listener itself (--lookup-ms adds a fake per-scan lookup cost to exercise
+backpressure). Pass --target HOST:PORT to fire the same traffic at a running
+GroceryMax instance instead; only send throughput is reported then.
+"""
+import argparse
+import socket
+import statistics
+import threading
+import time
+from app.scanner_bridge import ScannerServer
+
+
+def percentile(values, pct):
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def run_scanner(index, address, scans, rate, sent_at):
+    interval = 1.0 / rate if rate else 0
+    with socket.create_connection(address) as sock:
+        sock.sendall(f"SCANNER load-{index}\n".encode())
+        for seq in range(scans):
+            barcode = f"LOAD-{index}-{seq}"
+            sent_at[barcode] = time.perf_counter()
+            sock.sendall(f"{barcode}\n".encode())
+            if interval: time.sleep(interval)
+
+
+def run(scanners, scans, rate, lookup_ms, target):
+    sent_at, received_at, lock = {}, {}, threading.Lock()
+    stop_event = threading.Event()
+    server = None
+    if target:
+        host, port = target.rsplit(':', 1); address = (host, int(port))
+    else:
+        def on_scan(scanner_id, barcode, read_at):
+            if lookup_ms: time.sleep(lookup_ms / 1000)
+            with lock: received_at[barcode] = time.perf_counter()
+        server = ScannerServer('127.0.0.1', 0, on_scan, stop_event).start()
+        server.ready.wait(); address = ('127.0.0.1', server.port)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=run_scanner, args=(i, address, scans, rate, sent_at)) for i in range(scanners)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    sent_elapsed = time.perf_counter() - started
+    total = scanners * scans
+    print(f"sent {total} scans from {scanners} scanners in {sent_elapsed:.2f}s ({total / sent_elapsed:.0f} scans/s)")
+    if server is None: return
+
+    deadline = time.perf_counter() + 30
+    while len(received_at) < total and time.perf_counter() < deadline: time.sleep(0.05)
+    elapsed = max(received_at.values(), default=started) - started
+    latencies = sorted((received_at[b] - sent_at[b]) * 1000 for b in received_at)
+    print(f"delivered {len(received_at)}/{total} scans in {elapsed:.2f}s ({len(received_at) / elapsed if elapsed else 0:.0f} scans/s)")
+    print(f"latency ms: p50={statistics.median(latencies) if latencies else 0:.2f} "
+          f"p95={percentile(latencies, 95):.2f} p99={percentile(latencies, 99):.2f} max={latencies[-1] if latencies else 0:.2f}")
+    stop_event.set(); server.thread.join(timeout=5)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scanners', type=int, default=50)
+    parser.add_argument('--scans', type=int, default=200, help='scans sent by each scanner')
+    parser.add_argument('--rate', type=float, default=50, help='scans per second per scanner (0 = as fast as possible)')
+    parser.add_argument('--lookup-ms', type=float, default=0)
+    parser.add_argument('--target', help='HOST:PORT of a running scanner server')
+    args = parser.parse_args()
+    run(args.scanners, args.scans, args.rate, args.lookup_ms, args.target)
@@ -0,0 +1,53 @@
+# benchmarks/search.py
+"""
+Measures per-keystroke latency of the product search index.
+
+    python -m benchmarks.search --products 100000
+
+Builds a ProductSearchIndex over a synthetic catalog (no database needed) and
+replays a few queries one keystroke at a time, the way the POS search box
+issues them, including misspelt ones that fall through to the fuzzy tier.
+"""
+import argparse
+import random
+import statistics
+import time
+from app.search import ProductSearchIndex
+
+BRANDS = ['Organic', 'Fresh', 'Farm', 'Golden', 'Happy', 'Green', 'Sunny', 'Royal', 'Daily', 'Pure']
+ITEMS = ['Apples', 'Bananas', 'Carrots', 'Milk', 'Bread', 'Cheddar', 'Yogurt', 'Spinach', 'Tomatoes', 'Coffee',
+         'Rice', 'Pasta', 'Butter', 'Eggs', 'Oranges', 'Grapes', 'Potatoes', 'Onions', 'Chicken', 'Salmon']
+SIZES = ['250g', '500g', '1kg', '2kg', '1L', '2L', '6 pack', '12 pack']
+QUERIES = ['organic apples', 'milk 2l', 'happy chedar', 'bananna', 'grean spinach 500g', '400012']
+
+
+def build_index(count, seed=42):
+    rng = random.Random(seed)
+    index = ProductSearchIndex()
+    index.load((product_id, f"{rng.choice(BRANDS)} {rng.choice(ITEMS)} {rng.choice(SIZES)} #{product_id}",
+                f"{400000 + product_id}", f"{rng.choice(ITEMS)} and more") for product_id in range(1, count + 1))
+    return index
+
+
+def run(products, repeat):
+    started = time.perf_counter()
+    index = build_index(products)
+    print(f"indexed {len(index)} products in {time.perf_counter() - started:.2f}s")
+    print(f"{'query':<22} {'keys':>5} {'p50 ms':>8} {'max ms':>8}  top hit")
+    for query in QUERIES:
+        timings = []
+        for _ in range(repeat):
+            for i in range(1, len(query) + 1):
+                started = time.perf_counter()
+                hits = index.search(query[:i])
+                timings.append((time.perf_counter() - started) * 1000)
+        top = index._docs[hits[0]].name if hits else '-'
+        print(f"{query:<22} {len(query):>5} {statistics.median(timings):>8.3f} {max(timings):>8.3f}  {top}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run(args.products, args.repeat)
@@ -7,10 +7,111 @@ load_dotenv() # Loads variables from .env
 class Config:
     SECRET_KEY = os.environ.get('FLASK_SECRET_KEY')
 
+    # MySQL driver: mysqlconnector (pure Python) or mysqldb (the mysqlclient C extension, pip install mysqlclient)
+    DB_DRIVER = os.environ.get('DB_DRIVER', 'mysqlconnector')
+
     # New database URI format for SQLAlchemy
     SQLALCHEMY_DATABASE_URI = (
-        f"mysql+mysqlconnector://{os.environ.get('DB_USER')}:"
+        f"mysql+{DB_DRIVER}://{os.environ.get('DB_USER')}:"
         f"{os.environ.get('DB_PASSWORD')}@{os.environ.get('DB_HOST')}/"
         f"{os.environ.get('DB_NAME')}"
     )
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # In-process barcode -> product cache used by the POS scan path
+    BARCODE_CACHE_SIZE = int(os.environ.get('BARCODE_CACHE_SIZE', 10000))
+    BARCODE_CACHE_WARM = os.environ.get('BARCODE_CACHE_WARM', '1') == '1'
+    # Seconds an unknown barcode stays cached as unknown (products added by other processes show up after this)
+    BARCODE_CACHE_MISS_TTL = float(os.environ.get('BARCODE_CACHE_MISS_TTL', 60))
+
+    # In-memory product search index behind /api/products/search (built at startup)
+    SEARCH_INDEX_BUILD = os.environ.get('SEARCH_INDEX_BUILD', '1') == '1'
+    # At most this often a search checks whether other processes changed products and catches up (0 disables)
+    SEARCH_INDEX_REFRESH_SECONDS = float(os.environ.get('SEARCH_INDEX_REFRESH_SECONDS', 30))
+
+    # Admin dashboard stats/chart cache: seconds per entry (0 disables), with per-name overrides
+    # for 'index_stats', 'sales_last_7_days', 'sales_by_category' and 'best_sellers'
+    DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', 30))
+    DASHBOARD_CACHE_TTLS = {}
+
+    # Views decorated with @statement_budget raise instead of logging when they exceed their SQL budget
+    SQL_STATEMENT_BUDGET_STRICT = os.environ.get('SQL_STATEMENT_BUDGET_STRICT', '0') == '1'
+
+    # Request/SQL instrumentation: statements at least this slow are logged and counted on /metrics
+    SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 200))
+    # Bearer token a Prometheus scraper presents to /metrics (admins can always view it)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    # Lets admins add ?_profile=1 (cProfile) or ?_profile=pyinstrument to a URL to profile that request
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0') == '1'
+
+    # Barcode bridge events are JSON lines written by a background thread to this file (stdout when unset)
+    BRIDGE_LOG_FILE = os.environ.get('BRIDGE_LOG_FILE')
+    BRIDGE_LOG_LEVEL = os.environ.get('BRIDGE_LOG_LEVEL', 'INFO')
+    # A repeating bridge warning/error is written at most once per this many seconds per scanner/browser
+    BRIDGE_LOG_ERROR_INTERVAL = float(os.environ.get('BRIDGE_LOG_ERROR_INTERVAL', 10))
+
+    # Inventory ledger: `flask ledger snapshot --if-due` takes a stock snapshot once per interval;
+    # snapshots stop this many seconds short of now so transactions still in flight aren't cut in half
+    LEDGER_SNAPSHOT_INTERVAL_HOURS = float(os.environ.get('LEDGER_SNAPSHOT_INTERVAL_HOURS', 24))
+    LEDGER_SNAPSHOT_LAG = int(os.environ.get('LEDGER_SNAPSHOT_LAG', 300))
+
+    # Reorder point for products whose product and supplier don't set one (stock below it is low)
+    LOW_STOCK_REORDER_POINT = int(os.environ.get('LOW_STOCK_REORDER_POINT', 10))
+
+    # `flask replenish run`: daily sales velocity over the lookback, weighted towards the recent window, drafts
+    # orders for products whose stock plus open orders won't last the lead time, sized to last lead time + cover
+    REPLENISH_LOOKBACK_DAYS = int(os.environ.get('REPLENISH_LOOKBACK_DAYS', 365))
+    REPLENISH_RECENT_DAYS = int(os.environ.get('REPLENISH_RECENT_DAYS', 28))
+    REPLENISH_RECENT_WEIGHT = float(os.environ.get('REPLENISH_RECENT_WEIGHT', 0.5))
+    REPLENISH_LEAD_TIME_DAYS = float(os.environ.get('REPLENISH_LEAD_TIME_DAYS', 7))
+    REPLENISH_COVER_DAYS = float(os.environ.get('REPLENISH_COVER_DAYS', 14))
+
+    # Build missing tables with create_all at startup (the SQLite profiles; MySQL uses migrations)
+    CREATE_SCHEMA = False
+    # PRAGMAs run on every new SQLite connection
+    SQLITE_PRAGMAS = {}
+
+
+# --- PROFILES: create_app('mysql' | 'sqlite' | 'memory'), default from CONFIG_PROFILE ---
+class MySQLConfig(Config):
+    """Production: MySQL with a pre-pinged, recycled connection pool sized for the web workers."""
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        # Recycle before MySQL's wait_timeout drops idle connections; pre-ping catches the ones it already has
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 280)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1') == '1',
+        # Reuse the most recently returned connection so surplus ones sit idle and get recycled
+        'pool_use_lifo': True,
+    }
+    # Seconds to wait for MySQL to accept a new connection (passed to the driver under its own argument name)
+    DB_CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', 5))
+
+
+class SQLiteConfig(Config):
+    """Local SQLite file (relative paths live in the instance folder) for benchmarks and tests without a MySQL server."""
+    SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.environ.get('SQLITE_PATH', 'grocerymax.db')}"
+    CREATE_SCHEMA = True
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',       # readers don't block the writer
+        'synchronous': 'NORMAL',     # safe with WAL, far fewer fsyncs than FULL
+        'foreign_keys': 'ON',        # enforce FKs as MySQL does
+        'busy_timeout': 5000,        # wait for the write lock instead of failing with "database is locked"
+        'cache_size': -64000,        # 64 MB page cache
+        'temp_store': 'MEMORY',
+    }
+
+
+class MemoryConfig(SQLiteConfig):
+    """Throwaway in-memory SQLite: one shared connection, schema created at startup, gone on exit."""
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLITE_PRAGMAS = {**SQLiteConfig.SQLITE_PRAGMAS, 'journal_mode': 'MEMORY'}
+
+
+PROFILES = {'mysql': MySQLConfig, 'sqlite': SQLiteConfig, 'memory': MemoryConfig}
+
+
+def profile_for_uri(database_uri):
+    """The profile whose engine settings suit `database_uri`, for callers that bring their own URI."""
+    return SQLiteConfig if database_uri.startswith('sqlite') else MySQLConfig
@@ -1,6 +1,6 @@
 # seed.py
 from app import create_app
-from app.models import db, Category, Product, Customer, User
+from app.models import db, Category, Product, Customer, User, InventoryLog
 
 # Create a Flask app context to work with the database
 app = create_app()
@@ -41,7 +41,9 @@ def seed_data():
         p1 = Product(ProductName="Organic Apples", Description="Crisp Fuji variety", Category=cat_fruits, Price=0.75, StockQuantity=150)
         p2 = Product(ProductName="Bananas", Description="Bunch of 5, ripe", Category=cat_fruits, Price=1.99, StockQuantity=200)
         p3 = Product(ProductName="Carrots", Description="1lb bag, organic", Category=cat_veg, Price=1.29, StockQuantity=8)
-        db.session.add_all([p1, p2, p3])
+        db.session.add_all([p1, p2, p3]); db.session.flush()
+        # Opening stock goes through the inventory ledger like any other change
+        db.session.add_all([InventoryLog(ProductID=p.ProductID, ChangeType='Initial Stock', QuantityChange=p.StockQuantity, Notes='Seed data') for p in (p1, p2, p3)])
     else:
         print("Products already exist. Skipping.")
     